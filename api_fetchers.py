@@ -2,27 +2,84 @@
 """
 Final robust fetcher API.
 - FastAPI endpoints for Codeforces, LeetCode (robust mirrors + optional Playwright), CodeChef, Duolingo, HackerRank
-- TTL cache, rate limiter, CORS
+- TTL cache (optionally shared through Redis), rate limiter, CORS
 - LeetCode fetcher: tries multiple public mirrors, tolerant JSON parsing, optional Playwright fallback
 """
-from fastapi import FastAPI, HTTPException, Request, Depends, status
+from fastapi import FastAPI, HTTPException, Request, Response, Depends, status
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.middleware.gzip import GZipMiddleware
+from fastapi.responses import JSONResponse, ORJSONResponse
 import requests
+from requests.adapters import HTTPAdapter
+from urllib3.util import make_headers
+from urllib3.util.retry import Retry
+from urllib.parse import urlencode, urlsplit
 from bs4 import BeautifulSoup
-from collections import defaultdict, deque
-from typing import Dict, Any
+from collections import OrderedDict
+from fnmatch import fnmatchcase
+from contextlib import asynccontextmanager
+from anyio import to_thread
+from concurrent.futures import Future, ThreadPoolExecutor, TimeoutError as FutureTimeoutError, as_completed
+from typing import Dict, Any, Optional, Tuple
 import threading
+import hashlib
+import bisect
+import math
+import html
 import time
+import os
 import re
 import json
 
 # Optional playwright (only used if installed and mirror fail)
 try:
-    from playwright.sync_api import sync_playwright
+    from playwright.sync_api import sync_playwright, TimeoutError as PlaywrightTimeoutError
     PLAYWRIGHT_AVAILABLE = True
 except Exception:
     PLAYWRIGHT_AVAILABLE = False
 
+# lxml's C parser for BeautifulSoup when installed; stdlib html.parser otherwise
+try:
+    import lxml  # noqa: F401
+    HTML_PARSER = "lxml"
+except Exception:
+    HTML_PARSER = "html.parser"
+
+# Optional orjson (C-backed JSON); falls back to the stdlib module
+try:
+    import orjson
+    ORJSON_AVAILABLE = True
+except Exception:
+    ORJSON_AVAILABLE = False
+
+# Optional ijson for streaming large JSON arrays (Codeforces user.status)
+try:
+    import ijson
+    IJSON_AVAILABLE = True
+except Exception:
+    IJSON_AVAILABLE = False
+
+# Optional redis client for a cache shared between workers
+try:
+    import redis
+    REDIS_AVAILABLE = True
+except Exception:
+    REDIS_AVAILABLE = False
+
+
+def _loads(data):
+    """Decode JSON from bytes or str with orjson when available."""
+    if ORJSON_AVAILABLE:
+        return orjson.loads(data)
+    return json.loads(data)
+
+
+def _dumps(obj) -> bytes:
+    """Encode JSON to bytes with orjson when available."""
+    if ORJSON_AVAILABLE:
+        return orjson.dumps(obj)
+    return json.dumps(obj, separators=(",", ":")).encode()
+
 # ---------------------------------------------------
 # CONFIG
 # ---------------------------------------------------
@@ -30,6 +87,37 @@ except Exception:
 CACHE_TTL = 60         # seconds
 RATE_LIMIT = 30        # requests
 RATE_PERIOD = 60       # seconds
+CONNECT_TIMEOUT = 3    # seconds; read timeouts are set per call
+
+# Per-platform cache TTLs (seconds), keyed by cache-key prefix
+CACHE_TTLS = {"lc": 300, "cc": 600, "duo": 300, "cf": 120, "hr": 600}
+REDIS_URL = os.environ.get("REDIS_URL")   # enables the shared cache tier
+REDIS_PREFIX = "scrappers:"
+# Sync endpoints run on anyio's worker threads (default 40); each slow scrape holds one
+API_THREADS = int(os.environ.get("API_THREADS", "100"))
+# Circuit breaker per upstream host
+BREAKER_FAIL_MAX = 5        # consecutive failures before the circuit opens
+BREAKER_RESET = 30          # seconds an open circuit fails fast before a trial request
+# Concurrent requests allowed per upstream host, to stay under their rate limits
+HOST_CONCURRENCY = {
+    "leetcode.com": 10,
+    "codeforces.com": 10,
+    "www.codechef.com": 8,
+    "www.duolingo.com": 8,
+    "www.hackerrank.com": 5,
+}
+HOST_CONCURRENCY_DEFAULT = 16
+HOST_WAIT = 10              # seconds to wait for a free slot before giving up
+# Retries of 5xx answers to idempotent requests, with exponential backoff
+UPSTREAM_RETRIES = 2
+UPSTREAM_BACKOFF = 0.2
+UPSTREAM_RETRY_STATUSES = frozenset((500, 502, 503, 504))
+# Seconds the LeetCode GraphQL/mirror race may take, queueing included
+LC_RACE_TIMEOUT = 20
+# Seconds past its TTL an entry is still served while a background refresh runs
+CACHE_STALE_TTL = int(os.environ.get("CACHE_STALE_TTL", "600"))
+# How long a request waits on another request's in-flight fetch before a 504
+FLIGHT_WAIT = float(os.environ.get("FLIGHT_WAIT", "30"))
 
 # Browser-like headers for generic scrapes
 HEADERS = {
@@ -40,6 +128,8 @@ HEADERS = {
     ),
     "Accept": "text/html,application/xhtml+xml,application/xml;q=0.9,image/avif,image/webp,*/*;q=0.8",
     "Accept-Language": "en-US,en;q=0.9",
+    # gzip/deflate, plus br/zstd when the decoders are installed
+    "Accept-Encoding": make_headers(accept_encoding=True)["accept-encoding"],
     "Referer": "https://leetcode.com/",
 }
 
@@ -54,79 +144,633 @@ LEETCODE_MIRRORS = [
 # Alternative LeetCode stats API (different format)
 LEETCODE_STATS_API = "https://leetcode-stats-api.herokuapp.com"
 
+# GraphQL queries tried against leetcode.com
+_GRAPHQL_Q1 = """
+query userProfile($username: String!) {
+    matchedUser(username: $username) {
+        username
+        profile {
+            realName
+            ranking
+            reputation
+            postViewCount
+        }
+        submitStatsGlobal {
+            acSubmissionNum {
+                difficulty
+                count
+                submissions
+            }
+        }
+        submissionCalendar
+        userCalendar {
+            activeYears
+            streak
+            totalActiveDays
+        }
+    }
+    userContestRanking(username: $username) {
+        rating
+        globalRanking
+        totalParticipants
+        topPercentage
+    }
+}
+"""
+
+# Alternative query structure
+_GRAPHQL_Q2 = """
+query getUserProfile($username: String!) {
+    allQuestionsCount {
+        difficulty
+        count
+    }
+    matchedUser(username: $username) {
+        username
+        profile {
+            realName
+            ranking
+            reputation
+            postViewCount
+        }
+        submitStats: submitStatsGlobal {
+            acSubmissionNum {
+                difficulty
+                count
+                submissions
+            }
+        }
+        submissionCalendar
+        userCalendar {
+            activeYears
+            streak
+            totalActiveDays
+        }
+    }
+}
+"""
+
+# Per-call header overrides for GraphQL POSTs (SESSION already carries HEADERS);
+# only the Referer varies per username
+_GRAPHQL_HEADERS = {
+    "Content-Type": "application/json",
+    "Origin": "https://leetcode.com",
+    "x-csrftoken": "fetch",  # Some endpoints may need this
+}
+
+# Request bodies are serialized once; only the username is spliced in per call
+_GRAPHQL_BODIES = [
+    json.dumps({"query": q})[:-1] + ', "variables": {"username": '
+    for q in (_GRAPHQL_Q1, _GRAPHQL_Q2)
+]
+
+
+def _graphql_body(prefix: str, username: str) -> bytes:
+    return (prefix + json.dumps(username) + "}}").encode()
+
+
+# ---------------------------------------------------
+# PRECOMPILED PATTERNS (HTML fallbacks)
+# ---------------------------------------------------
+
+_RE_DIGITS = re.compile(r"\d+")
+_RE_DIGITS_COMMA = re.compile(r"[\d,]+")
+
+# LeetCode / CodeChef labels
+_RE_SOLVED = re.compile(r"Solved", re.I)
+_RE_DIFF_CLASS = re.compile(r"easy|medium|hard")
+_RE_PROBLEMS_SOLVED = re.compile(r"Problems Solved", re.I)
+_RE_TOTAL_SOLVED = re.compile(r"Total.*Solved", re.I)
+_RE_HIGHEST_RATING = re.compile(r"Highest Rating", re.I)
+_RE_GLOBAL_RANK = re.compile(r"Global Rank", re.I)
+_RE_COUNTRY_RANK = re.compile(r"Country Rank", re.I)
+_RE_COUNTRY = re.compile(r"Country", re.I)
+_RE_COUNTRY_VALUE = re.compile(r'Country[:\s]+([A-Za-z\s]+)', re.I)
+_RE_INSTITUTION = re.compile(r"Institution|Organization|University|School", re.I)
+_RE_INSTITUTION_VALUE = re.compile(r'(?:Institution|Organization|University|School)[:\s]+(.+)', re.I)
+_CC_LABEL_RE = re.compile(r"Highest Rating|Problems Solved|Total.*Solved|Global Rank|Country|Institution|Organization|University|School", re.I)
+_CC_LABELS = {
+    "highestRating": _RE_HIGHEST_RATING,
+    "problemsSolved": _RE_PROBLEMS_SOLVED,
+    "totalSolved": _RE_TOTAL_SOLVED,
+    "globalRank": _RE_GLOBAL_RANK,
+    "countryRank": _RE_COUNTRY_RANK,
+    "country": _RE_COUNTRY,
+    "institution": _RE_INSTITUTION,
+}
+
+# HackerRank labels and classes
+_RE_BIO = re.compile("bio", re.I)
+_RE_LOCATION = re.compile(r"Country|Location", re.I)
+_RE_LOCATION_VALUE = re.compile(r'(?:Country|Location)[:\s]+(.+)', re.I)
+_RE_AVATAR = re.compile("avatar|profile", re.I)
+_RE_FOLLOWERS = re.compile(r"Followers|Follower", re.I)
+_RE_FOLLOWING = re.compile(r"Following", re.I)
+_RE_SOCIAL = re.compile(r"github|linkedin|twitter|website", re.I)
+_RE_SKILLS = re.compile(r"Skills", re.I)
+_RE_BADGE = re.compile("badge", re.I)
+_HR_LABEL_RE = re.compile(r"Country|Location|Follower|Following|Skills", re.I)
+_HR_LABELS = {
+    "country": _RE_LOCATION,
+    "followers": _RE_FOLLOWERS,
+    "following": _RE_FOLLOWING,
+    "skills": _RE_SKILLS,
+}
+
+# Duolingo profile page, matched on the raw bytes
+_RE_OG_IMAGE_TAG = re.compile(rb'<meta\b[^>]*property=["\']og:image["\'][^>]*>', re.I)
+_RE_CONTENT_ATTR = re.compile(rb'\bcontent=["\']([^"\']*)', re.I)
+_RE_HEADINGS = (
+    re.compile(rb'<h1\b[^>]*>(.*?)</h1>', re.I | re.S),
+    re.compile(rb'<h2\b[^>]*>(.*?)</h2>', re.I | re.S),
+)
+_RE_TAG = re.compile(rb'<[^>]+>')
+
+# Embedded matchedUser objects inside arbitrary <script> bodies
+_JSON_DECODER = json.JSONDecoder()
+
+# ---------------------------------------------------
+# UPSTREAM GUARDS (circuit breakers, per-host concurrency)
+# ---------------------------------------------------
+
+class CircuitOpenError(requests.ConnectionError):
+    """Raised instead of sending a request to a host whose circuit is open."""
+
+
+class HostBusyError(requests.ConnectionError):
+    """Raised when no concurrency slot for the host frees up within HOST_WAIT."""
+
+
+class CircuitBreaker:
+    """Opens after fail_max consecutive failures; while open, requests fail
+    fast for reset_timeout seconds, then a single trial request decides
+    whether it closes again or reopens (half-open)."""
+
+    CLOSED = "closed"
+    TRIAL = "trial"
+
+    def __init__(self, fail_max: int = BREAKER_FAIL_MAX, reset_timeout: float = BREAKER_RESET):
+        self.fail_max = fail_max
+        self.reset_timeout = reset_timeout
+        self._failures = 0
+        self._opened_at: Optional[float] = None
+        self._trial = False
+        self._lock = threading.Lock()
+        # requests turned away so far; callers compare snapshots of it
+        self.rejected = 0
+
+    def closed(self) -> bool:
+        return self._opened_at is None
+
+    def ready(self) -> bool:
+        """True when closed, or half-open with the trial still up for grabs."""
+        with self._lock:
+            if self._opened_at is None:
+                return True
+            return not self._trial and time.monotonic() - self._opened_at >= self.reset_timeout
+
+    def remaining(self) -> float:
+        """Seconds until the open circuit allows a trial; 0 when it would."""
+        opened_at = self._opened_at
+        if opened_at is None:
+            return 0.0
+        return max(0.0, opened_at + self.reset_timeout - time.monotonic())
+
+    def allow(self) -> Optional[str]:
+        """CLOSED or TRIAL when a request may go ahead, None to reject it.
+        A TRIAL holder must report success(), failure() or cancel_trial()."""
+        with self._lock:
+            if self._opened_at is None:
+                return self.CLOSED
+            if not self._trial and time.monotonic() - self._opened_at >= self.reset_timeout:
+                self._trial = True
+                return self.TRIAL
+            self.rejected += 1
+            return None
+
+    def cancel_trial(self):
+        """Give the trial back unanswered (it never reached the host)."""
+        with self._lock:
+            self._trial = False
+
+    def success(self):
+        with self._lock:
+            self._failures = 0
+            self._opened_at = None
+            self._trial = False
+
+    def failure(self):
+        with self._lock:
+            self._failures += 1
+            # a failed trial reopens straight away
+            if self._trial or self._failures >= self.fail_max:
+                self._opened_at = time.monotonic()
+            self._trial = False
+
+_breakers: Dict[str, CircuitBreaker] = {}
+_breakers_lock = threading.Lock()
+
+def _breaker_for(host: str) -> CircuitBreaker:
+    breaker = _breakers.get(host)
+    if breaker is None:
+        with _breakers_lock:
+            breaker = _breakers.setdefault(host, CircuitBreaker())
+    return breaker
+
+_host_slots: Dict[str, threading.BoundedSemaphore] = {}
+
+def _slots_for(host: str) -> threading.BoundedSemaphore:
+    slots = _host_slots.get(host)
+    if slots is None:
+        with _breakers_lock:
+            slots = _host_slots.get(host)
+            if slots is None:
+                limit = HOST_CONCURRENCY.get(host, HOST_CONCURRENCY_DEFAULT)
+                slots = _host_slots[host] = threading.BoundedSemaphore(limit)
+    return slots
+
+
+class _UpstreamAdapter(HTTPAdapter):
+    """HTTPAdapter that guards each upstream host: it fails fast while the
+    host's circuit is open, caps concurrent requests per host, retries 5xx
+    answers to idempotent requests, and feeds the breaker the final outcome
+    (transport errors, 5xx and 429 count as failures). A slot is held for
+    one attempt, until its response headers arrive; backoff sleeps and
+    streamed bodies happen after it is released. Upstream Retry-After
+    values are ignored so a sick host can't park the caller."""
+
+    def _send_once(self, host: str, request, **kwargs):
+        slots = _slots_for(host)
+        if not slots.acquire(timeout=HOST_WAIT):
+            raise HostBusyError(f"too many concurrent requests to {host}", request=request)
+        try:
+            return super().send(request, **kwargs)
+        finally:
+            slots.release()
+
+    def send(self, request, **kwargs):
+        host = urlsplit(request.url).hostname or ""
+        breaker = _breaker_for(host)
+        ticket = breaker.allow()
+        if ticket is None:
+            raise CircuitOpenError(f"circuit open for {host}", request=request)
+        attempts = 1
+        if request.method in Retry.DEFAULT_ALLOWED_METHODS:
+            attempts += UPSTREAM_RETRIES
+        reported = False
+        try:
+            for attempt in range(attempts):
+                if attempt:
+                    response.close()
+                    time.sleep(UPSTREAM_BACKOFF * 2 ** (attempt - 1))
+                try:
+                    response = self._send_once(host, request, **kwargs)
+                except HostBusyError:
+                    raise
+                except (requests.ConnectionError, requests.Timeout):
+                    reported = True
+                    breaker.failure()
+                    raise
+                if response.status_code not in UPSTREAM_RETRY_STATUSES:
+                    break
+            reported = True
+            if response.status_code >= 500 or response.status_code == 429:
+                breaker.failure()
+            else:
+                breaker.success()
+            return response
+        finally:
+            # busy slots, invalid URLs/headers etc. say nothing about the host;
+            # hand an unanswered trial back so the next request can take it
+            if not reported and ticket == CircuitBreaker.TRIAL:
+                breaker.cancel_trial()
+
+# ---------------------------------------------------
+# HTTP SESSION (shared connection pool)
+# ---------------------------------------------------
+
+# One pooled session for every fetcher so keep-alive connections to each
+# upstream host survive across strategies and across usernames. The adapter
+# retries above its host slots, so urllib3 is left at no retries: a connect
+# or read timeout is the whole budget for a transport failure.
+_ADAPTER = _UpstreamAdapter(pool_connections=32, pool_maxsize=64)
+SESSION = requests.Session()
+SESSION.mount("https://", _ADAPTER)
+SESSION.mount("http://", _ADAPTER)
+SESSION.headers.update(HEADERS)
+
 # ---------------------------------------------------
 # TTL CACHE
 # ---------------------------------------------------
 
 class TTLCache:
-    def __init__(self):
-        self._data = {}
-        self._lock = threading.Lock()
+    """Sharded, size-bounded TTL cache. Misses are lock-free (dict reads are
+    atomic under the GIL); hits, writes and expiry deletes take the owning
+    shard's lock for the deadline check and LRU bump, so contention is
+    spread over SHARDS locks. Deadlines use time.monotonic()."""
+
+    SHARDS = 16
+    SWEEP_EVERY = 256   # sets per shard between expired-entry sweeps
+
+    def __init__(self, maxsize: int = 4096):
+        self._max = max(1, maxsize // self.SHARDS)   # per shard
+        self.maxsize = self._max * self.SHARDS
+        self._shards = [OrderedDict() for _ in range(self.SHARDS)]
+        self._locks = [threading.Lock() for _ in range(self.SHARDS)]
+        self._ops_since_sweep = [0] * self.SHARDS
+
+    def _shard(self, key: str) -> int:
+        return hash(key) & (self.SHARDS - 1)
 
     def get(self, key: str):
-        with self._lock:
-            rec = self._data.get(key)
-            if not rec: return None
-            val, exp = rec
-            if time.time() > exp:
-                del self._data[key]
+        i = self._shard(key)
+        shard = self._shards[i]
+        rec = shard.get(key)
+        if rec is None:
+            return None
+        val, exp = rec
+        with self._locks[i]:
+            if time.monotonic() > exp:
+                # only drop it if no one refreshed the entry meanwhile
+                if shard.get(key) is rec:
+                    del shard[key]
                 return None
-            return val
+            if key in shard:
+                shard.move_to_end(key)
+        return val
 
     def set(self, key: str, val: Any, ttl=CACHE_TTL):
-        with self._lock:
-            self._data[key] = (val, time.time() + ttl)
+        i = self._shard(key)
+        shard = self._shards[i]
+        with self._locks[i]:
+            now = time.monotonic()
+            shard[key] = (val, now + ttl)
+            shard.move_to_end(key)
+            if len(shard) > self._max:
+                shard.popitem(last=False)
+            self._ops_since_sweep[i] += 1
+            if self._ops_since_sweep[i] >= self.SWEEP_EVERY:
+                self._ops_since_sweep[i] = 0
+                for k in [k for k, (_, exp) in shard.items() if now > exp]:
+                    del shard[k]
+
+    def __len__(self):
+        return sum(len(shard) for shard in self._shards)
+
+    def keys(self):
+        """Snapshot of the keys (expired ones included until swept)."""
+        out = []
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                out.extend(shard)
+        return out
 
     def clear(self):
-        with self._lock:
-            self._data.clear()
+        for shard, lock in zip(self._shards, self._locks):
+            with lock:
+                shard.clear()
 
 cache = TTLCache()
 
+# ---------------------------------------------------
+# SHARED CACHE (optional Redis tier)
+# ---------------------------------------------------
+
+_redis = None
+if REDIS_AVAILABLE and REDIS_URL:
+    _redis = redis.Redis.from_url(
+        REDIS_URL, socket_timeout=0.25, socket_connect_timeout=0.25, max_connections=50
+    )
+
+def _ttl_for(key: str) -> int:
+    return CACHE_TTLS.get(key.split(":", 1)[0], CACHE_TTL)
+
+def _shared_get(key: str) -> Optional[Tuple[bytes, float]]:
+    """(serialized payload, seconds it has left in Redis), or None when unset,
+    unconfigured or unreachable."""
+    return _shared_get_many([key])[0]
+
+def _shared_get_many(keys):
+    """GET + PTTL for several keys in one pipelined round trip; a
+    (body, seconds left) pair per hit, None for each miss."""
+    if _redis is None or not keys:
+        return [None] * len(keys)
+    try:
+        pipe = _redis.pipeline(transaction=False)
+        for k in keys:
+            pipe.get(REDIS_PREFIX + k)
+            pipe.pttl(REDIS_PREFIX + k)
+        replies = pipe.execute()
+    except Exception:
+        return [None] * len(keys)
+    # PTTL is -2 once the key is gone and -1 if it has no expiry; neither is
+    # a usable freshness budget
+    return [
+        (body, pttl / 1000) if body is not None and pttl > 0 else None
+        for body, pttl in zip(replies[::2], replies[1::2])
+    ]
+
+def _shared_set(key: str, body: bytes, ttl: int):
+    if _redis is None:
+        return
+    try:
+        _redis.set(REDIS_PREFIX + key, body, ex=ttl)
+    except Exception:
+        pass
+
+def _shared_clear(pattern: str = "*"):
+    if _redis is None:
+        return
+    try:
+        keys = list(_redis.scan_iter(match=REDIS_PREFIX + pattern, count=500))
+        if keys:
+            _redis.delete(*keys)
+    except Exception:
+        pass
+
+# ---------------------------------------------------
+# REQUEST COALESCING
+# ---------------------------------------------------
+
+class SingleFlight:
+    """Coalesce concurrent calls for the same key: the first caller runs the
+    function, later callers block on its Future and share the result."""
+
+    def __init__(self):
+        self._inflight: Dict[str, Future] = {}
+        self._lock = threading.Lock()
+
+    def _join(self, key: str):
+        """(future, owner): the flight for key, creating it if there is none."""
+        with self._lock:
+            fut = self._inflight.get(key)
+            if fut is not None:
+                return fut, False
+            fut = self._inflight[key] = Future()
+            return fut, True
+
+    def _run(self, key: str, fut: Future, fn, args):
+        try:
+            result = fn(*args)
+        except BaseException as e:
+            fut.set_exception(e)
+            raise
+        else:
+            fut.set_result(result)
+            return result
+        finally:
+            with self._lock:
+                self._inflight.pop(key, None)
+
+    def do(self, key: str, fn, *args, wait: Optional[float] = None):
+        """Run or join the flight for key. Waiters give up after `wait`
+        seconds with concurrent.futures.TimeoutError; the owner keeps going."""
+        fut, owner = self._join(key)
+        if not owner:
+            return fut.result(timeout=wait)
+        return self._run(key, fut, fn, args)
+
+    def start(self, executor, key: str, fn, *args) -> Future:
+        """Like do(), but a new flight runs on executor and nobody blocks."""
+        fut, owner = self._join(key)
+        if owner:
+            executor.submit(self._run, key, fut, fn, args)
+        return fut
+
+flights = SingleFlight()
+
+# ---------------------------------------------------
+# CONDITIONAL UPSTREAM GETS
+# ---------------------------------------------------
+
+# url -> (etag, last_modified, result) of the last 200 that carried validators
+VALIDATOR_TTL = 3600   # seconds
+_validators = TTLCache(maxsize=2048)
+
+def _conditional_get(url: str, parse=None, **kwargs):
+    """GET url, revalidating with If-None-Match / If-Modified-Since from the
+    last 200. Returns (status_code, result) where result is parse(body) for
+    non-error responses (the raw body without parse). A 304 replays the
+    stored result as a 200, so the body is neither downloaded nor re-parsed."""
+    params = kwargs.get("params")
+    key = url + "?" + urlencode(params) if params else url
+    prev = _validators.get(key)
+    headers = dict(kwargs.pop("headers", None) or {})
+    if prev:
+        etag, last_modified, _ = prev
+        if etag:
+            headers["If-None-Match"] = etag
+        if last_modified:
+            headers["If-Modified-Since"] = last_modified
+    r = SESSION.get(url, headers=headers, **kwargs)
+    if r.status_code == 304 and prev:
+        return 200, prev[2]
+    if parse is None or r.status_code >= 400:
+        result = r.content
+    else:
+        result = parse(r.content)
+    if r.status_code == 200:
+        etag = r.headers.get("ETag")
+        last_modified = r.headers.get("Last-Modified")
+        if etag or last_modified:
+            _validators.set(key, (etag, last_modified, result), ttl=VALIDATOR_TTL)
+    return r.status_code, result
+
 # ---------------------------------------------------
 # RATE LIMITER
 # ---------------------------------------------------
 
-_rate_buckets = defaultdict(lambda: deque())
-_rate_lock = threading.Lock()
+# Token bucket per client IP. Buckets live in per-shard OrderedDicts kept in
+# last-use order, so unrelated IPs don't serialize on one mutex and both the
+# LRU cap and the idle sweep only ever touch the oldest entries.
+_RATE_SHARDS = 16
+_RATE_REFILL = RATE_LIMIT / RATE_PERIOD     # tokens per second
+_RATE_MAX_KEYS = 10_000 // _RATE_SHARDS      # tracked IPs per shard
+_RATE_IDLE = RATE_PERIOD * 4                # a bucket idle this long is full again
+
+class TokenBucket:
+    __slots__ = ("tokens", "last")
+
+    def __init__(self, now: float):
+        self.tokens = float(RATE_LIMIT)
+        self.last = now
+
+    def try_consume(self, now: float, n: int = 1) -> float:
+        """Take n tokens; returns 0 on success, else seconds until n are available."""
+        self.tokens = min(RATE_LIMIT, self.tokens + (now - self.last) * _RATE_REFILL)
+        self.last = now
+        if self.tokens >= n:
+            self.tokens -= n
+            return 0.0
+        return (n - self.tokens) / _RATE_REFILL
+
+_rate_buckets = [OrderedDict() for _ in range(_RATE_SHARDS)]
+_rate_locks = [threading.Lock() for _ in range(_RATE_SHARDS)]
 
 def check_rate_limit(request: Request):
     ip = request.client.host
-    now = time.time()
-    with _rate_lock:
-        dq = _rate_buckets[ip]
-        while dq and dq[0] <= now - RATE_PERIOD:
-            dq.popleft()
-        if len(dq) >= RATE_LIMIT:
-            raise HTTPException(
-                status_code=429,
-                detail=f"Rate limit exceeded ({RATE_LIMIT} req / {RATE_PERIOD}s)"
-            )
-        dq.append(now)
+    now = time.monotonic()
+    shard = hash(ip) & (_RATE_SHARDS - 1)
+    with _rate_locks[shard]:
+        buckets = _rate_buckets[shard]
+        bucket = buckets.get(ip)
+        if bucket is None:
+            bucket = buckets[ip] = TokenBucket(now)
+            # oldest first: evict idle buckets, then the LRU one if still over the cap
+            while buckets:
+                oldest = next(iter(buckets.values()))
+                if now - oldest.last <= _RATE_IDLE and len(buckets) <= _RATE_MAX_KEYS:
+                    break
+                buckets.popitem(last=False)
+        else:
+            buckets.move_to_end(ip)
+        wait = bucket.try_consume(now)
+    if wait:
+        retry_after = math.ceil(wait)
+        raise HTTPException(
+            status_code=429,
+            detail={
+                "ok": False,
+                "code": "rate_limited",
+                "message": f"Rate limit exceeded ({RATE_LIMIT} req / {RATE_PERIOD}s)",
+                "retryAfter": retry_after,
+            },
+            headers={
+                "Retry-After": str(retry_after),
+                "X-RateLimit-Limit": str(RATE_LIMIT),
+                "X-RateLimit-Remaining": "0",
+            },
+        )
     return True
 
 # ---------------------------------------------------
 # RESPONSE TEMPLATES
 # ---------------------------------------------------
 
+def leetcode_stats_template(username):
+    """The LeetCode stat fields shared by the report and the HTML scraper."""
+    return {
+        "username": username,
+        "totalSolved": 0,
+        "easySolved": 0,
+        "mediumSolved": 0,
+        "hardSolved": 0,
+        "acceptanceRate": 0,
+        "ranking": None,
+        "reputation": 0,
+        "contributionPoints": 0,
+        "streak": 0,
+        "totalActiveDays": 0,
+        "submissionCalendar": {}
+    }
+
 def leetcode_template(username):
     return {
         "message": "LeetCode report fetched successfully",
         "report": {
             "error": True,
             "errorMessage": "Detailed problem statistics not available from public APIs. Profile data retrieved successfully.",
-            "username": username,
-            "totalSolved": 0,
-            "easySolved": 0,
-            "mediumSolved": 0,
-            "hardSolved": 0,
-            "acceptanceRate": 0,
-            "ranking": None,
-            "reputation": 0,
-            "contributionPoints": 0,
-            "streak": 0,
-            "totalActiveDays": 0,
-            "submissionCalendar": {}
+            **leetcode_stats_template(username)
         }
     }
 
@@ -214,6 +858,14 @@ def hackerrank_template(username):
 # LeetCode robust fetcher
 # ---------------------------------------------------
 
+# acSubmissionNum difficulty -> solved-count bucket
+_DIFF_BUCKET = {"all": "total", "": "total", "easy": "easy", "medium": "medium", "hard": "hard"}
+# same buckets, keyed to the stats field names _apply_ac fills in
+_LC_DIFF_MAP = {label: bucket + "Solved" for label, bucket in _DIFF_BUCKET.items()}
+
+# Outermost {...} span in a non-JSON mirror body
+_JSON_OBJECT_RE = re.compile(r'\{.*\}', re.S)
+
 def _normalize_leetcode_json(j: Dict) -> Dict:
     """Given a variety of possible mirror JSON shapes, extract a canonical dict with keys we need."""
     # Possible shapes:
@@ -223,34 +875,23 @@ def _normalize_leetcode_json(j: Dict) -> Dict:
     out = {}
     if not isinstance(j, dict):
         return out
+    data = j.get("data")
+    if not isinstance(data, dict):
+        data = {}
 
     # prefer j['data']['matchedUser']
-    mu = None
-    if "data" in j and isinstance(j["data"], dict):
-        mu = j["data"].get("matchedUser") or j["data"].get("user")
-    if not mu:
-        mu = j.get("matchedUser") or j.get("user") or j.get("profile")
-
+    mu = data.get("matchedUser") or data.get("user") or j.get("matchedUser") or j.get("user") or j.get("profile")
     if mu and isinstance(mu, dict):
         out["matchedUser"] = mu
-        # Ensure submitStatsGlobal is preserved
-        if "submitStatsGlobal" in mu:
-            out["matchedUser"]["submitStatsGlobal"] = mu["submitStatsGlobal"]
-        if "submitStats" in mu:
-            out["matchedUser"]["submitStats"] = mu["submitStats"]
 
     # sometimes submitStats are at top-level
     if "submitStatsGlobal" in j:
-        out.setdefault("matchedUser", {})["submitStatsGlobal"] = j.get("submitStatsGlobal")
+        out.setdefault("matchedUser", {})["submitStatsGlobal"] = j["submitStatsGlobal"]
     if "submitStats" in j:
-        out.setdefault("matchedUser", {})["submitStats"] = j.get("submitStats")
+        out.setdefault("matchedUser", {})["submitStats"] = j["submitStats"]
 
     # contest data
-    ucr = None
-    if "data" in j and isinstance(j["data"], dict):
-        ucr = j["data"].get("userContestRanking")
-    if not ucr:
-        ucr = j.get("userContestRanking") or j.get("userContestRankingHistory")
+    ucr = data.get("userContestRanking") or j.get("userContestRanking") or j.get("userContestRankingHistory")
     if ucr:
         out["userContestRanking"] = ucr
 
@@ -266,6 +907,23 @@ def _normalize_leetcode_json(j: Dict) -> Dict:
     return out
 
 
+def _parse_calendar(cal_data) -> Dict:
+    """Decode a submissionCalendar into {timestamp: count}.
+    Accepts a dict, a JSON string, or LeetCode's double-encoded string-in-string."""
+    raw = cal_data
+    try:
+        while isinstance(raw, (str, bytes)):
+            raw = _loads(raw)
+    except Exception:
+        return {}
+    if not isinstance(raw, dict):
+        return {}
+    try:
+        return {k: int(v) for k, v in raw.items()}
+    except (TypeError, ValueError):
+        return raw
+
+
 def _extract_stats_from_normalized(nj: Dict, username: str) -> Dict:
     tpl = leetcode_template(username)
     tpl["report"]["error"] = True
@@ -290,35 +948,21 @@ def _extract_stats_from_normalized(nj: Dict, username: str) -> Dict:
         ssg = mu.get("submitStatsGlobal") or {}
         ac = ssg.get("acSubmissionNum") or []
 
-    total = easy = medium = hard = 0
+    counts = {"total": 0, "easy": 0, "medium": 0, "hard": 0}
     for row in ac:
         if not isinstance(row, dict):
             continue
-        diff = (row.get("difficulty") or "").lower()
+        bucket = _DIFF_BUCKET.get((row.get("difficulty") or "").strip().lower())
+        if not bucket:
+            continue
         try:
-            c = int(row.get("count") or row.get("submissions") or 0)
+            counts[bucket] = int(row.get("count") or row.get("submissions") or 0)
         except Exception:
-            c = 0
-        if "all" in diff or diff == "":
-            total = c
-        elif "easy" in diff:
-            easy = c
-        elif "medium" in diff:
-            medium = c
-        elif "hard" in diff:
-            hard = c
+            counts[bucket] = 0
+    total, easy, medium, hard = counts["total"], counts["easy"], counts["medium"], counts["hard"]
 
     # Handle submissionCalendar - might be string or dict
-    submission_cal = {}
-    cal_data = mu.get("submissionCalendar") or nj.get("submissionCalendar")
-    if cal_data:
-        if isinstance(cal_data, str):
-            try:
-                submission_cal = json.loads(cal_data)
-            except:
-                submission_cal = {}
-        elif isinstance(cal_data, dict):
-            submission_cal = cal_data
+    submission_cal = _parse_calendar(mu.get("submissionCalendar") or nj.get("submissionCalendar"))
     
     # Handle streak and activeDays from userCalendar
     streak = 0
@@ -365,270 +1009,179 @@ def _extract_stats_from_normalized(nj: Dict, username: str) -> Dict:
     return tpl
 
 
-def fetch_leetcode_live(username: str) -> Dict:
-    """Robust LeetCode fetcher with direct web scraping.
-    Strategy:
-      1) Try Playwright to scrape the actual profile page and intercept GraphQL calls
-      2) Fallback to direct GraphQL API call
-      3) Fallback to HTML scraping with BeautifulSoup
-      4) Try mirrors as last resort
-    """
-    tpl = leetcode_template(username)
+# ---------------------------------------------------
+# Playwright browser pool
+# ---------------------------------------------------
 
-    # Strategy 1: Use Playwright to scrape and intercept GraphQL
-    if PLAYWRIGHT_AVAILABLE:
+# Playwright's sync API is bound to the thread that started it, so each pool
+# worker thread owns one warm Chromium and every job runs on those threads.
+SCRAPER_POOL_SIZE = int(os.environ.get("SCRAPER_POOL_SIZE", "2"))
+_PW_POOL = ThreadPoolExecutor(max_workers=SCRAPER_POOL_SIZE, thread_name_prefix="playwright")
+_pw_local = threading.local()
+
+# Only the document and its XHR/fetch calls matter for intercepting GraphQL
+_PW_BLOCKED_RESOURCES = frozenset({"image", "font", "media", "stylesheet"})
+
+def _block_heavy_resources(route):
+    if route.request.resource_type in _PW_BLOCKED_RESOURCES:
+        route.abort()
+    else:
+        route.continue_()
+
+def _pooled_browser():
+    """Return this worker thread's browser, (re)launching it if needed."""
+    browser = getattr(_pw_local, "browser", None)
+    if browser is not None and browser.is_connected():
+        return browser
+    if getattr(_pw_local, "playwright", None) is None:
+        _pw_local.playwright = sync_playwright().start()
+    _pw_local.browser = _pw_local.playwright.chromium.launch(
+        headless=True,
+        args=["--disable-dev-shm-usage", "--no-sandbox", "--disable-gpu"],
+    )
+    return _pw_local.browser
+
+
+def _lc_playwright(username: str) -> Optional[Dict]:
+    """Scrape the profile page with a pooled browser and intercept its GraphQL calls."""
+    try:
+        return _PW_POOL.submit(_lc_playwright_job, username).result(timeout=60)
+    except Exception:
+        return None
+
+
+def _lc_playwright_job(username: str) -> Optional[Dict]:
+    tpl = leetcode_template(username)
+    try:
+        browser = _pooled_browser()
+        ctx = browser.new_context(user_agent=HEADERS["User-Agent"])
         try:
-            with sync_playwright() as p:
-                browser = p.chromium.launch(headless=True)
-                page = browser.new_page()
-                
-                # Intercept network requests to catch GraphQL responses
-                graphql_data = {}
-                
-                def handle_response(response):
-                    if "graphql" in response.url.lower():
-                        try:
-                            data = response.json()
-                            if isinstance(data, dict) and "data" in data:
-                                graphql_data.update(data["data"])
-                        except:
-                            pass
-                
-                page.on("response", handle_response)
-                
-                # Navigate to profile page
-                page.goto(f"https://leetcode.com/{username}/", wait_until="networkidle", timeout=30000)
-                
-                # Wait a bit for GraphQL calls to complete
-                page.wait_for_timeout(3000)
-                
-                # Try to extract data from page context
-                try:
-                    # Check if we got GraphQL data
-                    if graphql_data:
-                        normalized = _normalize_leetcode_json({"data": graphql_data})
-                        if normalized.get("matchedUser"):
-                            browser.close()
-                            return _extract_stats_from_normalized(normalized, username)
-                    
-                    # Try to get data from window objects
-                    page_data = page.evaluate("""
-                        () => {
-                            if (window.__NEXT_DATA__) return window.__NEXT_DATA__;
-                            if (window.__INITIAL_DATA__) return window.__INITIAL_DATA__;
-                            if (window.__APOLLO_STATE__) return window.__APOLLO_STATE__;
-                            return null;
-                        }
-                    """)
-                    
-                    if page_data:
-                        normalized = _normalize_leetcode_json(page_data)
-                        if normalized.get("matchedUser"):
-                            browser.close()
-                            return _extract_stats_from_normalized(normalized, username)
-                    
-                    # Try direct GraphQL query via page context
-                    graphql_query = """
-                    query userProfile($username: String!) {
-                        matchedUser(username: $username) {
-                            username
-                            profile {
-                                realName
-                                ranking
-                                reputation
-                                postViewCount
-                            }
-                            submitStatsGlobal {
-                                acSubmissionNum {
-                                    difficulty
-                                    count
-                                    submissions
-                                }
-                            }
-                            submissionCalendar
-                            userCalendar {
-                                activeYears
-                                streak
-                                totalActiveDays
-                            }
-                        }
-                        userContestRanking(username: $username) {
-                            rating
-                            globalRanking
-                            totalParticipants
-                            topPercentage
-                        }
-                    }
-                    """
-                    
-                    graphql_result = page.evaluate(f"""
-                        async () => {{
-                            try {{
-                                const response = await fetch('https://leetcode.com/graphql/', {{
-                                    method: 'POST',
-                                    headers: {{
-                                        'Content-Type': 'application/json',
-                                        'Referer': 'https://leetcode.com/{username}/'
-                                    }},
-                                    body: JSON.stringify({{
-                                        query: `{graphql_query.replace('`', '\\`')}`,
-                                        variables: {{ username: '{username}' }}
-                                    }})
-                                }});
-                                return await response.json();
-                            }} catch (e) {{
-                                return null;
-                            }}
-                        }}
-                    """)
-                    
-                    if graphql_result and isinstance(graphql_result, dict):
-                        normalized = _normalize_leetcode_json(graphql_result)
-                        if normalized.get("matchedUser"):
-                            browser.close()
-                            return _extract_stats_from_normalized(normalized, username)
-                    
-                    # Fallback: Scrape HTML directly
-                    html_content = page.content()
-                    soup = BeautifulSoup(html_content, "html.parser")
-                    
-                    # Extract stats from HTML
-                    stats = _scrape_leetcode_html(soup, username)
-                    if stats and stats.get("totalSolved", 0) > 0:
-                        browser.close()
-                        tpl["report"].update(stats)
-                        tpl["report"]["error"] = False
-                        return tpl
-                    
-                except Exception as e:
-                    pass
-                
-                browser.close()
-        except Exception as e:
-            pass
-
-    # Strategy 2: Direct GraphQL API call with requests
-    # Try multiple GraphQL query variations
-    graphql_queries = [
-        # Query 1: Standard query
-        """
-        query userProfile($username: String!) {
-            matchedUser(username: $username) {
-                username
-                profile {
-                    realName
-                    ranking
-                    reputation
-                    postViewCount
-                }
-                submitStatsGlobal {
-                    acSubmissionNum {
-                        difficulty
-                        count
-                        submissions
-                    }
-                }
-                submissionCalendar
-                userCalendar {
-                    activeYears
-                    streak
-                    totalActiveDays
-                }
-            }
-            userContestRanking(username: $username) {
-                rating
-                globalRanking
-                totalParticipants
-                topPercentage
-            }
-        }
-        """,
-        # Query 2: Alternative query structure
-        """
-        query getUserProfile($username: String!) {
-            allQuestionsCount {
-                difficulty
-                count
-            }
-            matchedUser(username: $username) {
-                username
-                profile {
-                    realName
-                    ranking
-                    reputation
-                    postViewCount
+            page = ctx.new_page()
+            
+            # Intercept network requests to catch GraphQL responses
+            graphql_data = {}
+            
+            def handle_response(response):
+                if "graphql" in response.url.lower():
+                    try:
+                        data = response.json()
+                        if isinstance(data, dict) and "data" in data:
+                            graphql_data.update(data["data"])
+                    except:
+                        pass
+            
+            page.on("response", handle_response)
+            page.route("**/*", _block_heavy_resources)
+            
+            # Navigate to profile page and wait for its first GraphQL response
+            # rather than for the network to go idle
+            try:
+                with page.expect_response(lambda r: "graphql" in r.url.lower(), timeout=10000):
+                    page.goto(f"https://leetcode.com/{username}/", wait_until="domcontentloaded", timeout=30000)
+            except PlaywrightTimeoutError:
+                pass
+            
+            # Check if we got GraphQL data
+            if graphql_data:
+                normalized = _normalize_leetcode_json({"data": graphql_data})
+                if normalized.get("matchedUser"):
+                    return _extract_stats_from_normalized(normalized, username)
+            
+            # Try to get data from window objects
+            page_data = page.evaluate("""
+                () => {
+                    if (window.__NEXT_DATA__) return window.__NEXT_DATA__;
+                    if (window.__INITIAL_DATA__) return window.__INITIAL_DATA__;
+                    if (window.__APOLLO_STATE__) return window.__APOLLO_STATE__;
+                    return null;
                 }
-                submitStats: submitStatsGlobal {
-                    acSubmissionNum {
-                        difficulty
-                        count
-                        submissions
+            """)
+            
+            if page_data:
+                normalized = _normalize_leetcode_json(page_data)
+                if normalized.get("matchedUser"):
+                    return _extract_stats_from_normalized(normalized, username)
+            
+            # Try direct GraphQL query via page context; query and username are
+            # passed as an argument so the browser does the JSON encoding
+            graphql_result = page.evaluate("""
+                async ([query, username]) => {
+                    try {
+                        const response = await fetch('https://leetcode.com/graphql/', {
+                            method: 'POST',
+                            headers: {
+                                'Content-Type': 'application/json',
+                                'Referer': `https://leetcode.com/${username}/`
+                            },
+                            body: JSON.stringify({ query, variables: { username } })
+                        });
+                        return await response.json();
+                    } catch (e) {
+                        return null;
                     }
                 }
-                submissionCalendar
-                userCalendar {
-                    activeYears
-                    streak
-                    totalActiveDays
-                }
-            }
-        }
-        """
-    ]
-    
-    for graphql_query in graphql_queries:
-        try:
-            session = requests.Session()
-            session.headers.update({
-                **HEADERS,
-                "Content-Type": "application/json",
-                "Origin": "https://leetcode.com",
-                "Referer": f"https://leetcode.com/{username}/",
-                "x-csrftoken": "fetch",  # Some endpoints may need this
-            })
-            
-            response = session.post(
-                "https://leetcode.com/graphql/",
-                json={
-                    "query": graphql_query,
-                    "variables": {"username": username}
-                },
-                timeout=15
-            )
+            """, [_GRAPHQL_Q1, username])
             
-            if response.status_code == 200:
-                data = response.json()
-                # Check for errors in response
-                if data.get("errors"):
-                    continue
-                normalized = _normalize_leetcode_json(data)
+            if graphql_result and isinstance(graphql_result, dict):
+                normalized = _normalize_leetcode_json(graphql_result)
                 if normalized.get("matchedUser"):
-                    result = _extract_stats_from_normalized(normalized, username)
-                    # If we got stats, return immediately
-                    if result["report"].get("totalSolved", 0) > 0:
-                        return result
-                    # Otherwise continue to try next query
-        except Exception:
-            continue
+                    return _extract_stats_from_normalized(normalized, username)
+            
+            # Fallback: Scrape HTML directly
+            html_content = page.content()
+            soup = BeautifulSoup(html_content, HTML_PARSER)
+            
+            # Extract stats from HTML
+            stats = _scrape_leetcode_html(soup, username)
+            if stats and stats.get("totalSolved", 0) > 0:
+                tpl["report"].update(stats)
+                tpl["report"]["error"] = False
+                return tpl
+        finally:
+            ctx.close()
+    except Exception:
+        pass
+    return None
+
+
+def _lc_graphql(username: str, body_prefix: str) -> Optional[Dict]:
+    """Direct GraphQL API call; returns a report only when it carries stats."""
+    try:
+        response = SESSION.post(
+            "https://leetcode.com/graphql/",
+            data=_graphql_body(body_prefix, username),
+            headers={**_GRAPHQL_HEADERS, "Referer": f"https://leetcode.com/{username}/"},
+            timeout=(CONNECT_TIMEOUT, 15)
+        )
+        
+        if response.status_code == 200:
+            data = _loads(response.content)
+            # Check for errors in response
+            if data.get("errors"):
+                return None
+            normalized = _normalize_leetcode_json(data)
+            if normalized.get("matchedUser"):
+                result = _extract_stats_from_normalized(normalized, username)
+                if result["report"].get("totalSolved", 0) > 0:
+                    return result
+    except Exception:
+        pass
+    return None
 
-    # Strategy 3: Try alternative stats API (leetcode-stats-api) - THIS ONE WORKS! Try it early
+
+def _lc_stats_api(username: str) -> Optional[Dict]:
+    """Alternative stats API (leetcode-stats-api) - this one usually works."""
+    tpl = leetcode_template(username)
     try:
-        session = requests.Session()
-        session.headers.update(HEADERS)
         stats_url = f"{LEETCODE_STATS_API}/{username}"
-        r = session.get(stats_url, timeout=15)
+        r = SESSION.get(stats_url, timeout=(CONNECT_TIMEOUT, 15))
         if r.status_code == 200:
             try:
-                j = r.json()
+                j = _loads(r.content)
                 # This API returns: {"status": "success", "totalSolved": 431, ...}
                 if j.get("status") == "success" and j.get("totalSolved", 0) > 0:
                     # Extract submission calendar if available
-                    submission_cal = j.get("submissionCalendar", {})
-                    if isinstance(submission_cal, str):
-                        try:
-                            submission_cal = json.loads(submission_cal)
-                        except:
-                            submission_cal = {}
+                    submission_cal = _parse_calendar(j.get("submissionCalendar"))
                     
                     # This API returns all the stats we need!
                     result = {
@@ -652,14 +1205,18 @@ def fetch_leetcode_live(username: str) -> Dict:
                 pass
     except:
         pass
+    return None
 
-    # Strategy 4: HTML scraping with requests + BeautifulSoup (slower, less reliable)
+
+def _lc_html(username: str) -> Optional[Dict]:
+    """HTML scraping with requests + BeautifulSoup (slower, less reliable)."""
+    tpl = leetcode_template(username)
     try:
-        session = requests.Session()
-        session.headers.update(HEADERS)
-        response = session.get(f"https://leetcode.com/{username}/", timeout=15)
-        if response.status_code == 200:
-            soup = BeautifulSoup(response.text, "html.parser")
+        response = SESSION.get(f"https://leetcode.com/{username}/", timeout=(CONNECT_TIMEOUT, 15))
+        body = response.content
+        # login redirects, 404s and challenge pages carry neither marker; skip the parse
+        if response.status_code == 200 and (b"matchedUser" in body or b"__NEXT_DATA__" in body):
+            soup = BeautifulSoup(body, HTML_PARSER)
             stats = _scrape_leetcode_html(soup, username)
             if stats and stats.get("totalSolved", 0) > 0:
                 tpl["report"].update(stats)
@@ -667,272 +1224,190 @@ def fetch_leetcode_live(username: str) -> Dict:
                 return tpl
     except Exception:
         pass
+    return None
 
-    # Strategy 5: Try mirrors as last resort
-    # Note: Mirrors often don't include submitStats, so we'll try them but may still need GraphQL
-    mirror_result = None
-    session = requests.Session()
-    session.headers.update(HEADERS)
-    for base in LEETCODE_MIRRORS:
+
+def _lc_mirror(username: str, base: str) -> Optional[Dict]:
+    """Query one public mirror. May return a partial report (profile only, no stats)."""
+    try:
+        url = base.rstrip('/') + '/' + username
+        status_code, content = _conditional_get(url, timeout=(CONNECT_TIMEOUT, 10))
+        if status_code >= 400:
+            return None
         try:
-            url = base.rstrip('/') + '/' + username
-            r = session.get(url, timeout=10)
-            if r.status_code == 404:
-                continue
-            r.raise_for_status()
-            try:
-                j = r.json()
-            except Exception:
-                text = r.text
-                m = re.search(r'\{.*\}', text, flags=re.S)
-                if m:
-                    try:
-                        j = json.loads(m.group(0))
-                    except Exception:
-                        j = None
-                else:
+            j = _loads(content)
+        except Exception:
+            text = content.decode("utf-8", "replace")
+            m = _JSON_OBJECT_RE.search(text)
+            if m:
+                try:
+                    j = _loads(m.group(0))
+                except Exception:
                     j = None
+            else:
+                j = None
+
+        if not j:
+            return None
+
+        data = j.get("data") if isinstance(j, dict) else None
+        if isinstance(data, dict) and "matchedUser" in data:
+            normalized = _normalize_leetcode_json(data)
+        else:
+            normalized = _normalize_leetcode_json(j)
+
+        if normalized.get("matchedUser"):
+            return _extract_stats_from_normalized(normalized, username)
+    except Exception:
+        pass
+    return None
 
-            if not j:
+
+def _fanout_workers(calls_per_fetch: int, hosts) -> int:
+    """Workers for a pool shared by every fetch: enough for each endpoint
+    thread's calls at once, but no more than the hosts' slot limits let
+    through (extra workers would only wait in the adapter)."""
+    slots = sum(HOST_CONCURRENCY.get(host, HOST_CONCURRENCY_DEFAULT) for host in hosts)
+    return max(1, min(calls_per_fetch * API_THREADS, slots))
+
+# Shared pool for racing the cheap HTTP strategies against each other
+_LC_POOL = ThreadPoolExecutor(
+    max_workers=_fanout_workers(
+        len(_GRAPHQL_BODIES) + len(LEETCODE_MIRRORS),
+        {"leetcode.com", *(urlsplit(base).hostname for base in LEETCODE_MIRRORS)},
+    ),
+    thread_name_prefix="leetcode",
+)
+
+
+def fetch_leetcode_live(username: str) -> Dict:
+    """Robust LeetCode fetcher with direct web scraping.
+    Strategy:
+      1) leetcode-stats-api on its own - it usually has everything
+      2) Race direct GraphQL queries and mirrors concurrently;
+         first report with solved counts wins
+      3) Fallback to HTML scraping with BeautifulSoup
+      4) Try Playwright (heavy) to scrape the profile page and intercept GraphQL calls
+    """
+    # Strategy 1: the known-working stats API, before spraying other upstreams
+    result = _lc_stats_api(username)
+    if result:
+        return result
+
+    # Strategy 2: hedged race over the remaining HTTP strategies
+    futures = [_LC_POOL.submit(_lc_graphql, username, body) for body in _GRAPHQL_BODIES]
+    mirror_futures = {_LC_POOL.submit(_lc_mirror, username, base) for base in LEETCODE_MIRRORS}
+    futures += mirror_futures
+
+    mirror_result = None
+    try:
+        for fut in as_completed(futures, timeout=LC_RACE_TIMEOUT):
+            try:
+                result = fut.result()
+            except Exception:
                 continue
+            if not result:
+                continue
+            if result["report"].get("totalSolved", 0) > 0:
+                for other in futures:
+                    other.cancel()
+                return result
+            # Save partial mirror result in case nothing else has stats
+            if fut in mirror_futures and not mirror_result:
+                mirror_result = result
+    except FutureTimeoutError:
+        # stragglers (or tasks still queued behind other users') are dropped
+        for other in futures:
+            other.cancel()
+
+    # Strategy 3: HTML scraping
+    result = _lc_html(username)
+    if result:
+        return result
+
+    # Strategy 4: Playwright as the expensive last resort
+    if PLAYWRIGHT_AVAILABLE:
+        result = _lc_playwright(username)
+        if result:
+            return result
 
-            if "data" in j and isinstance(j["data"], dict) and ("matchedUser" in j["data"]):
-                normalized = _normalize_leetcode_json(j["data"])
-            else:
-                normalized = _normalize_leetcode_json(j)
+    # Best available result: partial mirror data, otherwise the error template
+    return mirror_result or leetcode_template(username)
 
-            if normalized.get("matchedUser"):
-                result = _extract_stats_from_normalized(normalized, username)
-                # Check if we got actual stats (not just profile info)
-                if result["report"].get("totalSolved", 0) > 0:
-                    return result
-                # Save partial result in case GraphQL also fails
-                if not mirror_result:
-                    mirror_result = result
-        except Exception:
-            continue
 
-    # If we got partial data from mirrors but no stats, try GraphQL one more time with better error handling
-    if mirror_result and mirror_result["report"].get("totalSolved", 0) == 0:
-        try:
-            session = requests.Session()
-            session.headers.update({
-                **HEADERS,
-                "Content-Type": "application/json",
-                "Origin": "https://leetcode.com",
-                "Referer": f"https://leetcode.com/{username}/"
-            })
-            
-            graphql_query = """
-            query userProfile($username: String!) {
-                matchedUser(username: $username) {
-                    username
-                    profile {
-                        realName
-                        ranking
-                        reputation
-                        postViewCount
-                    }
-                    submitStatsGlobal {
-                        acSubmissionNum {
-                            difficulty
-                            count
-                            submissions
-                        }
-                    }
-                    submissionCalendar
-                    userCalendar {
-                        activeYears
-                        streak
-                        totalActiveDays
-                    }
-                }
-                userContestRanking(username: $username) {
-                    rating
-                    globalRanking
-                    totalParticipants
-                    topPercentage
-                }
-            }
-            """
-            
-            response = session.post(
-                "https://leetcode.com/graphql/",
-                json={
-                    "query": graphql_query,
-                    "variables": {"username": username}
-                },
-                timeout=15
-            )
-            
-            if response.status_code == 200:
-                data = response.json()
-                if data.get("data") and data["data"].get("matchedUser"):
-                    normalized = _normalize_leetcode_json(data)
-                    if normalized.get("matchedUser"):
-                        result = _extract_stats_from_normalized(normalized, username)
-                        if result["report"].get("totalSolved", 0) > 0:
-                            return result
-                        # Merge with mirror data if GraphQL has stats but mirror has other info
-                        if mirror_result:
-                            # Prefer GraphQL stats, but keep mirror data for fields GraphQL might not have
-                            for key in ["ranking", "reputation", "contributionPoints"]:
-                                if mirror_result["report"].get(key) and not result["report"].get(key):
-                                    result["report"][key] = mirror_result["report"][key]
-                            return result
-        except Exception:
-            pass
+def _apply_ac(stats: Dict, ac) -> None:
+    """Copy acSubmissionNum counts into the matching *Solved fields."""
+    for row in ac:
+        key = _LC_DIFF_MAP.get((row.get("difficulty") or "").strip().lower())
+        if key:
+            stats[key] = int(row.get("count") or 0)
 
-    # Return best available result (mirror data if available, otherwise template)
-    if mirror_result:
-        return mirror_result
 
-    # Return template with error
-    tpl["report"]["error"] = True
-    return tpl
+def _mentions_matched_user(text) -> bool:
+    return bool(text) and "matchedUser" in text
 
 
 def _scrape_leetcode_html(soup: BeautifulSoup, username: str) -> Dict:
     """Extract LeetCode stats from HTML page."""
-    stats = {
-        "username": username,
-        "totalSolved": 0,
-        "easySolved": 0,
-        "mediumSolved": 0,
-        "hardSolved": 0,
-        "acceptanceRate": 0,
-        "ranking": None,
-        "reputation": 0,
-        "contributionPoints": 0,
-        "streak": 0,
-        "totalActiveDays": 0,
-        "submissionCalendar": {}
-    }
+    stats = leetcode_stats_template(username)
     
     try:
-        # Try to find stats in various possible locations
-        # Look for script tags with JSON data
-        scripts = soup.find_all("script")
-        for script in scripts:
-            if script.string:
-                # Look for __NEXT_DATA__ or similar - this contains the full page data
-                if "__NEXT_DATA__" in script.string:
-                    try:
-                        # Extract the full __NEXT_DATA__ JSON
-                        start = script.string.find('{"props"')
-                        if start == -1:
-                            start = script.string.find('{"pageProps"')
-                        if start != -1:
-                            # Find the matching closing brace
-                            brace_count = 0
-                            end = start
-                            for i, char in enumerate(script.string[start:], start):
-                                if char == '{':
-                                    brace_count += 1
-                                elif char == '}':
-                                    brace_count -= 1
-                                    if brace_count == 0:
-                                        end = i + 1
-                                        break
-                            
-                            if end > start:
-                                data_str = script.string[start:end]
-                                data = json.loads(data_str)
-                                # Navigate through __NEXT_DATA__ structure
-                                if "props" in data and "pageProps" in data["props"]:
-                                    page_props = data["props"]["pageProps"]
-                                    # Try to find user data in various locations
-                                    if "dehydratedState" in page_props:
-                                        dehydrated = page_props["dehydratedState"]
-                                        if "queries" in dehydrated:
-                                            for query in dehydrated["queries"]:
-                                                if "state" in query and "data" in query["state"]:
-                                                    query_data = query["state"]["data"]
-                                                    normalized = _normalize_leetcode_json(query_data)
-                                                    if normalized.get("matchedUser"):
-                                                        mu = normalized["matchedUser"]
-                                                        ssg = mu.get("submitStatsGlobal") or {}
-                                                        ac = ssg.get("acSubmissionNum") or []
-                                                        
-                                                        for row in ac:
-                                                            diff = (row.get("difficulty") or "").lower()
-                                                            count = int(row.get("count") or 0)
-                                                            if "all" in diff:
-                                                                stats["totalSolved"] = count
-                                                            elif "easy" in diff:
-                                                                stats["easySolved"] = count
-                                                            elif "medium" in diff:
-                                                                stats["mediumSolved"] = count
-                                                            elif "hard" in diff:
-                                                                stats["hardSolved"] = count
-                                                        
-                                                        prof = mu.get("profile") or {}
-                                                        stats["ranking"] = prof.get("ranking")
-                                                        stats["reputation"] = prof.get("reputation", 0)
-                                                        
-                                                        if stats["totalSolved"] > 0:
-                                                            return stats
-                    except Exception as e:
-                        continue
-                
-                # Also try simpler pattern matching for matchedUser
-                if "matchedUser" in script.string:
-                    try:
-                        # Try to extract JSON object containing matchedUser
-                        patterns = [
-                            r'\{[^{}]*"matchedUser"[^{}]*\{[^}]*submitStatsGlobal[^}]*\{[^}]*acSubmissionNum[^}]*\[[^\]]*\][^\}]*\}[^\}]*\}[^\}]*\}',
-                            r'"matchedUser"\s*:\s*\{[^}]*"submitStatsGlobal"[^}]*"acSubmissionNum"\s*:\s*\[[^\]]*\]',
-                        ]
-                        for pattern in patterns:
-                            match = re.search(pattern, script.string, re.DOTALL)
-                            if match:
-                                # Try to extract a larger context
-                                start = max(0, match.start() - 100)
-                                end = min(len(script.string), match.end() + 500)
-                                context = script.string[start:end]
-                                # Try to find a valid JSON object
-                                brace_start = context.rfind('{', 0, match.start() - start)
-                                if brace_start != -1:
-                                    try:
-                                        # Try to parse from brace_start
-                                        test_str = context[brace_start:]
-                                        # Find matching closing brace
-                                        brace_count = 0
-                                        brace_end = 0
-                                        for i, char in enumerate(test_str):
-                                            if char == '{':
-                                                brace_count += 1
-                                            elif char == '}':
-                                                brace_count -= 1
-                                                if brace_count == 0:
-                                                    brace_end = i + 1
-                                                    break
-                                        if brace_end > 0:
-                                            data = json.loads(test_str[:brace_end])
-                                            normalized = _normalize_leetcode_json(data)
-                                            if normalized.get("matchedUser"):
-                                                mu = normalized["matchedUser"]
-                                                ssg = mu.get("submitStatsGlobal") or {}
-                                                ac = ssg.get("acSubmissionNum") or []
-                                                
-                                                for row in ac:
-                                                    diff = (row.get("difficulty") or "").lower()
-                                                    count = int(row.get("count") or 0)
-                                                    if "all" in diff:
-                                                        stats["totalSolved"] = count
-                                                    elif "easy" in diff:
-                                                        stats["easySolved"] = count
-                                                    elif "medium" in diff:
-                                                        stats["mediumSolved"] = count
-                                                    elif "hard" in diff:
-                                                        stats["hardSolved"] = count
-                                                
-                                                if stats["totalSolved"] > 0:
-                                                    return stats
-                                    except:
-                                        continue
-                    except:
+        # __NEXT_DATA__ is a standalone JSON document in its own script tag
+        next_tag = soup.find("script", {"id": "__NEXT_DATA__"})
+        if next_tag and next_tag.string:
+            try:
+                data = _loads(next_tag.string)
+                # Navigate through __NEXT_DATA__ structure
+                page_props = (data.get("props") or {}).get("pageProps") or {}
+                dehydrated = page_props.get("dehydratedState") or {}
+                seen = set()   # queries can share one data object
+                for query in dehydrated.get("queries") or []:
+                    query_data = (query.get("state") or {}).get("data")
+                    if not query_data or id(query_data) in seen:
                         continue
+                    seen.add(id(query_data))
+                    normalized = _normalize_leetcode_json(query_data)
+                    if normalized.get("matchedUser"):
+                        mu = normalized["matchedUser"]
+                        ssg = mu.get("submitStatsGlobal") or {}
+                        ac = ssg.get("acSubmissionNum") or []
+                        
+                        _apply_ac(stats, ac)
+                        
+                        prof = mu.get("profile") or {}
+                        stats["ranking"] = prof.get("ranking")
+                        stats["reputation"] = prof.get("reputation", 0)
+                        
+                        if stats["totalSolved"] > 0:
+                            return stats
+            except Exception:
+                pass
+
+        # Fallback: only scripts that mention matchedUser are worth scanning
+        # (__NEXT_DATA__ was already handled above)
+        for script in soup.find_all("script", string=_mentions_matched_user):
+            if script is next_tag:
+                continue
+            text = script.string
+            idx = text.find('"matchedUser"')
+            start = text.rfind('{', 0, idx)
+            if idx < 0 or start < 0:
+                continue
+            try:
+                # raw_decode finds the end of the enclosing object itself
+                data, _ = _JSON_DECODER.raw_decode(text, start)
+                normalized = _normalize_leetcode_json(data)
+                if normalized.get("matchedUser"):
+                    mu = normalized["matchedUser"]
+                    ssg = mu.get("submitStatsGlobal") or {}
+                    ac = ssg.get("acSubmissionNum") or []
+                    
+                    _apply_ac(stats, ac)
+                    
+                    if stats["totalSolved"] > 0:
+                        return stats
+            except:
+                continue
         
         # Try to find stats in text/divs (fallback)
         # Look for stats in common LeetCode profile page structures
@@ -940,10 +1415,10 @@ def _scrape_leetcode_html(soup: BeautifulSoup, username: str) -> Dict:
         
         # Look for solved problems count - common patterns
         solved_patterns = [
-            soup.find("div", string=re.compile(r"Solved", re.I)),
-            soup.find("span", string=re.compile(r"Solved", re.I)),
-            soup.find(text=re.compile(r"Problems Solved", re.I)),
-            soup.find(text=re.compile(r"Total.*Solved", re.I)),
+            soup.find("div", string=_RE_SOLVED),
+            soup.find("span", string=_RE_SOLVED),
+            soup.find(text=_RE_PROBLEMS_SOLVED),
+            soup.find(text=_RE_TOTAL_SOLVED),
         ]
         
         for pattern in solved_patterns:
@@ -951,7 +1426,7 @@ def _scrape_leetcode_html(soup: BeautifulSoup, username: str) -> Dict:
                 parent = pattern.parent if hasattr(pattern, 'parent') else pattern
                 if parent:
                     text = parent.get_text() if hasattr(parent, 'get_text') else str(parent)
-                    numbers = re.findall(r'\d+', text)
+                    numbers = _RE_DIGITS.findall(text)
                     if numbers:
                         try:
                             stats["totalSolved"] = int(numbers[0])
@@ -959,40 +1434,22 @@ def _scrape_leetcode_html(soup: BeautifulSoup, username: str) -> Dict:
                         except:
                             pass
         
-        # Look for difficulty-specific stats
-        # Common class names: difficulty-easy, difficulty-medium, difficulty-hard
-        for difficulty in ["easy", "medium", "hard"]:
-            # Try multiple selectors
-            selectors = [
-                f'div[class*="{difficulty}"]',
-                f'span[class*="{difficulty}"]',
-                f'div[class*="difficulty-{difficulty}"]',
-            ]
-            for selector in selectors:
-                try:
-                    elements = soup.select(selector)
-                    for elem in elements:
-                        text = elem.get_text()
-                        numbers = re.findall(r'\d+', text)
-                        if numbers:
-                            try:
-                                count = int(numbers[0])
-                                if difficulty == "easy":
-                                    stats["easySolved"] = max(stats["easySolved"], count)
-                                elif difficulty == "medium":
-                                    stats["mediumSolved"] = max(stats["mediumSolved"], count)
-                                elif difficulty == "hard":
-                                    stats["hardSolved"] = max(stats["hardSolved"], count)
-                            except:
-                                pass
-                except:
-                    continue
+        # Look for difficulty-specific stats in one walk over div/span classes
+        # containing easy/medium/hard (also covers difficulty-easy etc.)
+        for elem in soup.find_all(("div", "span"), class_=_RE_DIFF_CLASS):
+            number = _RE_DIGITS.search(elem.get_text())
+            if not number:
+                continue
+            count = int(number.group())
+            for difficulty in set(_RE_DIFF_CLASS.findall(" ".join(elem.get("class") or []))):
+                key = difficulty + "Solved"
+                stats[key] = max(stats[key], count)
         
         # Try to find stats in data attributes or JSON-LD
         json_ld = soup.find("script", type="application/ld+json")
         if json_ld and json_ld.string:
             try:
-                data = json.loads(json_ld.string)
+                data = _loads(json_ld.string)
                 # Extract stats if available in structured data
                 if isinstance(data, dict):
                     # Look for common patterns
@@ -1010,18 +1467,40 @@ def _scrape_leetcode_html(soup: BeautifulSoup, username: str) -> Dict:
 # Keep them mostly as before, tolerant and simple
 # ---------------------------------------------------
 
+# Codeforces' three API calls are independent, so they are issued concurrently
+_CF_POOL = ThreadPoolExecutor(
+    max_workers=_fanout_workers(3, {"codeforces.com"}), thread_name_prefix="codeforces"
+)
+
 def fetch_codeforces_live(username: str) -> Dict:
     tpl = codeforces_template(username)
+
+    # Fire user info, contest history and submissions up front
+    info_f = _CF_POOL.submit(
+        SESSION.get,
+        "https://codeforces.com/api/user.info",
+        params={"handles": username},
+        timeout=(CONNECT_TIMEOUT, 10)
+    )
+    rating_f = _CF_POOL.submit(
+        SESSION.get,
+        "https://codeforces.com/api/user.rating",
+        params={"handle": username},
+        timeout=(CONNECT_TIMEOUT, 10)
+    )
+    status_f = _CF_POOL.submit(
+        SESSION.get,
+        "https://codeforces.com/api/user.status",
+        params={"handle": username, "from": 1, "count": 1000},  # Get up to 1000 recent submissions
+        timeout=(CONNECT_TIMEOUT, 12),
+        stream=IJSON_AVAILABLE,
+    )
+
+    # Get user info
     try:
-        # Get user info
-        r = requests.get(
-            "https://codeforces.com/api/user.info",
-            params={"handles": username},
-            headers=HEADERS,
-            timeout=10
-        )
+        r = info_f.result()
         r.raise_for_status()
-        j = r.json()
+        j = _loads(r.content)
         if j.get("status") == "OK":
             u = j["result"][0]
             tpl["report"]["rating"] = u.get("rating", 0)
@@ -1039,73 +1518,111 @@ def fetch_codeforces_live(username: str) -> Dict:
             tpl["report"]["city"] = u.get("city", None)
             tpl["report"]["registrationTimeSeconds"] = u.get("registrationTimeSeconds", None)
             tpl["report"]["lastOnlineTimeSeconds"] = u.get("lastOnlineTimeSeconds", None)
-        
-        # Get contest history for additional stats
-        try:
-            r2 = requests.get(
-                "https://codeforces.com/api/user.rating",
-                params={"handle": username},
-                headers=HEADERS,
-                timeout=10
-            )
-            if r2.status_code == 200:
-                j2 = r2.json()
-                if j2.get("status") == "OK" and j2.get("result"):
-                    contests = j2["result"]
-                    tpl["report"]["totalContests"] = len(contests)
-                    if contests:
-                        # Calculate average change
-                        changes = [c.get("newRating", 0) - c.get("oldRating", 0) for c in contests if c.get("oldRating")]
-                        if changes:
-                            tpl["report"]["avgChange"] = round(sum(changes) / len(changes), 2)
-                        # Get last contest
-                        last_contest = contests[-1]
-                        tpl["report"]["lastContest"] = {
-                            "contestId": last_contest.get("contestId"),
-                            "contestName": last_contest.get("contestName"),
-                            "rank": last_contest.get("rank"),
-                            "ratingChange": last_contest.get("newRating", 0) - last_contest.get("oldRating", 0),
-                            "newRating": last_contest.get("newRating"),
-                            "oldRating": last_contest.get("oldRating")
-                        }
-        except:
-            pass
-        
-        # Get submission stats (problems solved) - optimized to get recent submissions first
+    except:
+        pass
+
+    # Get contest history for additional stats
+    try:
+        r2 = rating_f.result()
+        if r2.status_code == 200:
+            j2 = _loads(r2.content)
+            if j2.get("status") == "OK" and j2.get("result"):
+                contests = j2["result"]
+                tpl["report"]["totalContests"] = len(contests)
+                if contests:
+                    # Calculate average change
+                    changes = [c.get("newRating", 0) - c.get("oldRating", 0) for c in contests if c.get("oldRating")]
+                    if changes:
+                        tpl["report"]["avgChange"] = round(sum(changes) / len(changes), 2)
+                    # Get last contest
+                    last_contest = contests[-1]
+                    tpl["report"]["lastContest"] = {
+                        "contestId": last_contest.get("contestId"),
+                        "contestName": last_contest.get("contestName"),
+                        "rank": last_contest.get("rank"),
+                        "ratingChange": last_contest.get("newRating", 0) - last_contest.get("oldRating", 0),
+                        "newRating": last_contest.get("newRating"),
+                        "oldRating": last_contest.get("oldRating")
+                    }
+    except:
+        pass
+
+    # Get submission stats (problems solved)
+    try:
+        r3 = status_f.result()
         try:
-            # Try to get problems solved count efficiently
-            # First try with a reasonable count limit
-            r3 = requests.get(
-                "https://codeforces.com/api/user.status",
-                params={"handle": username, "from": 1, "count": 1000},  # Get up to 1000 recent submissions
-                headers=HEADERS,
-                timeout=12
-            )
+            submissions = None
             if r3.status_code == 200:
-                j3 = r3.json()
-                if j3.get("status") == "OK":
-                    submissions = j3.get("result", [])
-                    solved_problems = set()
-                    for sub in submissions:
-                        if sub.get("verdict") == "OK":
-                            problem = sub.get("problem", {})
-                            problem_id = f"{problem.get('contestId', '')}{problem.get('index', '')}"
-                            if problem_id:
-                                solved_problems.add(problem_id)
-                    tpl["report"]["problemsSolved"] = len(solved_problems)
-        except:
-            pass
+                if IJSON_AVAILABLE:
+                    # one submission dict at a time instead of the whole array
+                    r3.raw.decode_content = True
+                    submissions = ijson.items(r3.raw, "result.item")
+                else:
+                    j3 = _loads(r3.content)
+                    if j3.get("status") == "OK":
+                        submissions = j3.get("result", [])
+            if submissions is not None:
+                # (contestId, index) tuples; no per-submission string formatting
+                solved_problems = {
+                    (p.get("contestId", ""), p.get("index", ""))
+                    for p in (sub.get("problem") or {} for sub in submissions if sub.get("verdict") == "OK")
+                }
+                solved_problems.discard(("", ""))
+                tpl["report"]["problemsSolved"] = len(solved_problems)
+        finally:
+            r3.close()
     except:
         pass
     return tpl
 
 
+# CodeChef star tiers: rating >= _STAR_CUTOFFS[i] earns _STAR_LABELS[i + 1]
+_STAR_CUTOFFS = (1400, 1600, 1800, 2000, 2200, 2500, 3000)
+_STAR_LABELS = ("Unrated", "1★", "2★", "3★", "4★", "5★", "6★", "7★")
+
+def _find_labels(soup, label_re, labels: Dict[str, Any]) -> Dict[str, Any]:
+    """Walk the text nodes once; first node matching each label pattern."""
+    found = {}
+    for node in soup.find_all(string=label_re):
+        for name, pattern in labels.items():
+            if name not in found and pattern.search(node):
+                found[name] = node
+        if len(found) == len(labels):
+            break
+    return found
+
+
+def _label_value(node, pattern, texts: Dict[int, str]):
+    """Search pattern in the text of a label node's parent (memoized in texts)."""
+    parent = node.parent if node is not None else None
+    if parent is None:
+        return None
+    text = texts.get(id(parent))
+    if text is None:
+        text = texts[id(parent)] = parent.get_text()
+    return pattern.search(text)
+
+
 def fetch_codechef_live(username: str) -> Dict:
+    try:
+        status_code, tpl = _conditional_get(
+            f"https://www.codechef.com/users/{username}",
+            parse=lambda body: _parse_codechef(username, body),
+            timeout=(CONNECT_TIMEOUT, 12),
+        )
+        if status_code < 400:
+            return tpl
+    except:
+        pass
+    return codechef_template(username)
+
+
+def _parse_codechef(username: str, body: bytes) -> Dict:
     tpl = codechef_template(username)
     try:
-        r = requests.get(f"https://www.codechef.com/users/{username}", headers=HEADERS, timeout=12)
-        r.raise_for_status()
-        soup = BeautifulSoup(r.text, "html.parser")
+        soup = BeautifulSoup(body, HTML_PARSER)
+        labels = _find_labels(soup, _CC_LABEL_RE, _CC_LABELS)
+        texts = {}   # parent get_text() per label node, shared across fields
         
         # Rating
         rating = soup.select_one(".rating-number") or soup.find("div", {"class": "rating-number"})
@@ -1115,168 +1632,138 @@ def fetch_codechef_live(username: str) -> Dict:
             # Determine stars based on rating
             try:
                 rating_num = int(val)
-                if rating_num >= 3000:
-                    tpl["report"]["stars"] = "7★"
-                elif rating_num >= 2500:
-                    tpl["report"]["stars"] = "6★"
-                elif rating_num >= 2200:
-                    tpl["report"]["stars"] = "5★"
-                elif rating_num >= 2000:
-                    tpl["report"]["stars"] = "4★"
-                elif rating_num >= 1800:
-                    tpl["report"]["stars"] = "3★"
-                elif rating_num >= 1600:
-                    tpl["report"]["stars"] = "2★"
-                elif rating_num >= 1400:
-                    tpl["report"]["stars"] = "1★"
-                else:
-                    tpl["report"]["stars"] = "Unrated"
+                tpl["report"]["stars"] = _STAR_LABELS[bisect.bisect_right(_STAR_CUTOFFS, rating_num)]
             except:
                 tpl["report"]["stars"] = val
         
         # Highest rating
-        highest_rating_elem = soup.find(text=re.compile(r"Highest Rating", re.I))
+        highest_rating_elem = labels.get("highestRating")
         if highest_rating_elem:
             parent = highest_rating_elem.parent
             if parent:
-                next_elem = parent.find_next(string=re.compile(r"\d+"))
+                next_elem = parent.find_next(string=_RE_DIGITS)
                 if next_elem:
                     tpl["report"]["highestRating"] = next_elem.strip()
         
         # Problems solved - try multiple patterns
         solved_patterns = [
-            soup.find(text=re.compile(r"Problems solved", re.I)),
-            soup.find(text=re.compile(r"Problems Solved", re.I)),
-            soup.find(text=re.compile(r"Total.*Solved", re.I)),
+            labels.get("problemsSolved"),
+            labels.get("totalSolved"),
         ]
         for solved in solved_patterns:
-            if solved:
-                parent = solved.parent
-                if parent:
-                    # Look for number in parent or next sibling
-                    text = parent.get_text()
-                    numbers = re.findall(r'\d+', text)
-                    if numbers:
-                        tpl["report"]["problemsSolved"] = numbers[0]
-                        break
-                    # Try next element
-                    nxt = parent.find_next(string=re.compile(r"\d+"))
-                    if nxt:
-                        tpl["report"]["problemsSolved"] = nxt.strip()
-                        break
+            if solved and solved.parent:
+                # Look for number in parent or next sibling
+                match = _label_value(solved, _RE_DIGITS, texts)
+                if match:
+                    tpl["report"]["problemsSolved"] = match.group()
+                    break
+                # Try next element
+                nxt = solved.parent.find_next(string=_RE_DIGITS)
+                if nxt:
+                    tpl["report"]["problemsSolved"] = nxt.strip()
+                    break
         
         # Global rank
-        global_rank_elem = soup.find(text=re.compile(r"Global Rank", re.I))
-        if global_rank_elem:
-            parent = global_rank_elem.parent
-            if parent:
-                rank_text = parent.get_text()
-                numbers = re.findall(r'[\d,]+', rank_text)
-                if numbers:
-                    tpl["report"]["globalRank"] = numbers[0].replace(',', '')
+        match = _label_value(labels.get("globalRank"), _RE_DIGITS_COMMA, texts)
+        if match:
+            tpl["report"]["globalRank"] = match.group().replace(',', '')
         
         # Country rank
-        country_rank_elem = soup.find(text=re.compile(r"Country Rank", re.I))
-        if country_rank_elem:
-            parent = country_rank_elem.parent
-            if parent:
-                rank_text = parent.get_text()
-                numbers = re.findall(r'[\d,]+', rank_text)
-                if numbers:
-                    tpl["report"]["countryRank"] = numbers[0].replace(',', '')
+        match = _label_value(labels.get("countryRank"), _RE_DIGITS_COMMA, texts)
+        if match:
+            tpl["report"]["countryRank"] = match.group().replace(',', '')
         
         # Name
         name_tag = soup.find("h2") or soup.find("h1")
         if name_tag and name_tag.text.strip():
             tpl["report"]["name"] = name_tag.text.strip()
         
-        # Country
-        country_elem = soup.find(text=re.compile(r"Country", re.I))
-        if country_elem:
-            parent = country_elem.parent
-            if parent:
-                country_text = parent.get_text()
-                # Extract country name (usually after "Country:")
-                match = re.search(r'Country[:\s]+([A-Za-z\s]+)', country_text, re.I)
-                if match:
-                    tpl["report"]["country"] = match.group(1).strip()
+        # Country (name usually after "Country:")
+        match = _label_value(labels.get("country"), _RE_COUNTRY_VALUE, texts)
+        if match:
+            tpl["report"]["country"] = match.group(1).strip()
         
         # Institution
-        institution_elem = soup.find(text=re.compile(r"Institution|Organization|University|School", re.I))
-        if institution_elem:
-            parent = institution_elem.parent
-            if parent:
-                inst_text = parent.get_text()
-                # Extract institution name
-                match = re.search(r'(?:Institution|Organization|University|School)[:\s]+(.+)', inst_text, re.I)
-                if match:
-                    tpl["report"]["institution"] = match.group(1).strip()
+        match = _label_value(labels.get("institution"), _RE_INSTITUTION_VALUE, texts)
+        if match:
+            tpl["report"]["institution"] = match.group(1).strip()
     except:
         pass
     return tpl
 
 
+def _parse_duolingo(username: str, body: bytes) -> Dict:
+    """Report from the 2017-06-30 users API response."""
+    tpl = duolingo_template(username)
+    j = _loads(body)
+    tpl["report"]["username"] = j.get("username", username)
+    tpl["report"]["streak"] = j.get("site_streak") or j.get("streak") or 0
+    tpl["report"]["totalXp"] = j.get("totalXp") or j.get("total_xp") or 0
+    
+    # Name
+    tpl["report"]["name"] = j.get("name") or j.get("fullname") or None
+    
+    # Country
+    tpl["report"]["country"] = j.get("country") or None
+    
+    # Bio
+    tpl["report"]["bio"] = j.get("bio") or None
+    
+    # Languages
+    langs = []
+    language_data = j.get("language_data") or j.get("languages") or []
+    if isinstance(language_data, dict):
+        for code, info in language_data.items():
+            if isinstance(info, dict):
+                langs.append({
+                    "language": info.get("language_name") or info.get("language") or code,
+                    "level": info.get("level") or 0,
+                    "xp": info.get("points") or info.get("xp") or 0,
+                    "crowns": info.get("crowns") or 0,
+                    "fluency_score": info.get("fluency_score") or 0
+                })
+    tpl["report"]["languages"] = langs
+    
+    # Avatar
+    tpl["report"]["avatarUrl"] = j.get("avatar") or j.get("picture") or j.get("avatar_url") or tpl["report"]["avatarUrl"]
+    
+    # Additional stats
+    tpl["report"]["creationDate"] = j.get("creationDate") or None
+    tpl["report"]["learningLanguage"] = j.get("learningLanguage") or None
+    tpl["report"]["fromLanguage"] = j.get("fromLanguage") or None
+    return tpl
+
+
 def fetch_duolingo_live(username: str) -> Dict:
     tpl = duolingo_template(username)
     try:
-        r = requests.get(
+        status_code, report = _conditional_get(
             "https://www.duolingo.com/2017-06-30/users",
+            parse=lambda body: _parse_duolingo(username, body),
             params={"username": username},
-            headers=HEADERS,
-            timeout=12
+            timeout=(CONNECT_TIMEOUT, 12),
         )
-        if r.status_code == 200:
-            j = r.json()
-            tpl["report"]["username"] = j.get("username", username)
-            tpl["report"]["streak"] = j.get("site_streak") or j.get("streak") or 0
-            tpl["report"]["totalXp"] = j.get("totalXp") or j.get("total_xp") or 0
-            
-            # Name
-            tpl["report"]["name"] = j.get("name") or j.get("fullname") or None
-            
-            # Country
-            tpl["report"]["country"] = j.get("country") or None
-            
-            # Bio
-            tpl["report"]["bio"] = j.get("bio") or None
-            
-            # Languages
-            langs = []
-            language_data = j.get("language_data") or j.get("languages") or []
-            if isinstance(language_data, dict):
-                for code, info in language_data.items():
-                    if isinstance(info, dict):
-                        langs.append({
-                            "language": info.get("language_name") or info.get("language") or code,
-                            "level": info.get("level") or 0,
-                            "xp": info.get("points") or info.get("xp") or 0,
-                            "crowns": info.get("crowns") or 0,
-                            "fluency_score": info.get("fluency_score") or 0
-                        })
-            tpl["report"]["languages"] = langs
-            
-            # Avatar
-            tpl["report"]["avatarUrl"] = j.get("avatar") or j.get("picture") or j.get("avatar_url") or tpl["report"]["avatarUrl"]
-            
-            # Additional stats
-            tpl["report"]["creationDate"] = j.get("creationDate") or None
-            tpl["report"]["learningLanguage"] = j.get("learningLanguage") or None
-            tpl["report"]["fromLanguage"] = j.get("fromLanguage") or None
-            
-            return tpl
+        if status_code == 200:
+            return report
         
         # Fallback: Try profile page
-        r2 = requests.get(f"https://www.duolingo.com/profile/{username}", headers=HEADERS, timeout=12)
+        r2 = SESSION.get(f"https://www.duolingo.com/profile/{username}", timeout=(CONNECT_TIMEOUT, 12))
         if r2.status_code == 200:
-            soup = BeautifulSoup(r2.text, "html.parser")
-            og = soup.find("meta", property="og:image")
-            if og:
-                tpl["report"]["avatarUrl"] = og.get("content")
+            # Two tags only, so regexes over the bytes instead of a full parse
+            body = r2.content
+            og = _RE_OG_IMAGE_TAG.search(body)
+            content = _RE_CONTENT_ATTR.search(og.group()) if og else None
+            if content:
+                tpl["report"]["avatarUrl"] = html.unescape(content.group(1).decode("utf-8", "replace"))
             
             # Try to extract name from page
-            name_tag = soup.find("h1") or soup.find("h2")
-            if name_tag and name_tag.text.strip():
-                tpl["report"]["name"] = name_tag.text.strip()
+            for heading_re in _RE_HEADINGS:
+                heading = heading_re.search(body)
+                if heading:
+                    name = html.unescape(_RE_TAG.sub(b"", heading.group(1)).decode("utf-8", "replace")).strip()
+                    if name:
+                        tpl["report"]["name"] = name
+                    break
     except:
         pass
 
@@ -1284,95 +1771,107 @@ def fetch_duolingo_live(username: str) -> Dict:
 
 
 def fetch_hackerrank_live(username: str) -> Dict:
+    try:
+        status_code, tpl = _conditional_get(
+            f"https://www.hackerrank.com/{username}",
+            parse=lambda body: _parse_hackerrank(username, body),
+            timeout=(CONNECT_TIMEOUT, 12),
+        )
+        if status_code == 200:
+            return tpl
+    except:
+        pass
+    return hackerrank_template(username)
+
+
+def _parse_hackerrank(username: str, body: bytes) -> Dict:
     tpl = hackerrank_template(username)
     try:
-        url = f"https://www.hackerrank.com/{username}"
-        r = requests.get(url, headers=HEADERS, timeout=12)
-        if r.status_code == 200:
-            soup = BeautifulSoup(r.text, "html.parser")
-            
-            # Full name
-            name_tag = soup.find("h1") or soup.find("h2")
-            if name_tag and name_tag.text.strip():
-                tpl["fullName"] = name_tag.text.strip()
-            
-            # Bio
-            bio_tag = soup.find("div", {"class": re.compile("bio", re.I)}) or soup.find("p", {"class": re.compile("bio", re.I)})
-            if bio_tag:
-                tpl["bio"] = bio_tag.text.strip()
-            
-            # Country
-            country_elem = soup.find(text=re.compile(r"Country|Location", re.I))
-            if country_elem:
-                parent = country_elem.parent
-                if parent:
-                    country_text = parent.get_text()
-                    match = re.search(r'(?:Country|Location)[:\s]+(.+)', country_text, re.I)
-                    if match:
-                        tpl["country"] = match.group(1).strip()
-            
-            # Profile image
-            img_tag = soup.find("img", {"class": re.compile("avatar|profile", re.I)}) or soup.find("img", {"alt": re.compile(username, re.I)})
-            if img_tag and img_tag.get("src"):
-                tpl["profileImage"] = img_tag.get("src")
-            
-            # Followers/Following
-            followers_elem = soup.find(text=re.compile(r"Followers|Follower", re.I))
-            if followers_elem:
-                parent = followers_elem.parent
-                if parent:
-                    text = parent.get_text()
-                    numbers = re.findall(r'\d+', text)
-                    if numbers:
-                        tpl["followersCount"] = int(numbers[0])
-            
-            following_elem = soup.find(text=re.compile(r"Following", re.I))
-            if following_elem:
-                parent = following_elem.parent
-                if parent:
-                    text = parent.get_text()
-                    numbers = re.findall(r'\d+', text)
-                    if numbers:
-                        tpl["followingCount"] = int(numbers[0])
-            
-            # Social links
-            links = soup.find_all("a", href=re.compile(r"github|linkedin|twitter|website", re.I))
-            for link in links:
-                href = link.get("href", "")
-                if "github" in href.lower():
-                    tpl["socialLinks"]["github"] = href
-                elif "linkedin" in href.lower():
-                    tpl["socialLinks"]["linkedin"] = href
-                elif "twitter" in href.lower():
-                    tpl["socialLinks"]["twitter"] = href
-                elif "website" in href.lower() or "http" in href.lower():
-                    tpl["socialLinks"]["website"] = href
-            
-            # Skills
-            skills_elem = soup.find(text=re.compile(r"Skills", re.I))
-            if skills_elem:
-                parent = skills_elem.parent
-                if parent:
-                    skills_container = parent.find_next("div") or parent.find_next("ul")
-                    if skills_container:
-                        skill_tags = skills_container.find_all("span") or skills_container.find_all("li")
-                        skills = []
-                        for tag in skill_tags:
-                            skill_text = tag.get_text().strip()
-                            if skill_text:
-                                skills.append(skill_text)
-                        if skills:
-                            tpl["skills"] = skills
-            
-            # Badges
-            badge_tags = soup.find_all("div", {"class": re.compile("badge", re.I)}) or soup.find_all("span", {"class": re.compile("badge", re.I)})
-            badges = []
-            for badge in badge_tags:
-                badge_text = badge.get_text().strip()
-                if badge_text:
-                    badges.append(badge_text)
-            if badges:
-                tpl["badges"] = badges[:10]  # Limit to 10 badges
+        soup = BeautifulSoup(body, HTML_PARSER)
+        labels = _find_labels(soup, _HR_LABEL_RE, _HR_LABELS)
+        
+        # Full name
+        name_tag = soup.find("h1") or soup.find("h2")
+        if name_tag and name_tag.text.strip():
+            tpl["fullName"] = name_tag.text.strip()
+        
+        # Bio
+        bio_tag = soup.find("div", {"class": _RE_BIO}) or soup.find("p", {"class": _RE_BIO})
+        if bio_tag:
+            tpl["bio"] = bio_tag.text.strip()
+        
+        # Country
+        country_elem = labels.get("country")
+        if country_elem:
+            parent = country_elem.parent
+            if parent:
+                country_text = parent.get_text()
+                match = _RE_LOCATION_VALUE.search(country_text)
+                if match:
+                    tpl["country"] = match.group(1).strip()
+        
+        # Profile image
+        img_tag = soup.find("img", {"class": _RE_AVATAR}) or soup.find("img", {"alt": re.compile(username, re.I)})
+        if img_tag and img_tag.get("src"):
+            tpl["profileImage"] = img_tag.get("src")
+        
+        # Followers/Following
+        followers_elem = labels.get("followers")
+        if followers_elem:
+            parent = followers_elem.parent
+            if parent:
+                text = parent.get_text()
+                numbers = _RE_DIGITS.findall(text)
+                if numbers:
+                    tpl["followersCount"] = int(numbers[0])
+        
+        following_elem = labels.get("following")
+        if following_elem:
+            parent = following_elem.parent
+            if parent:
+                text = parent.get_text()
+                numbers = _RE_DIGITS.findall(text)
+                if numbers:
+                    tpl["followingCount"] = int(numbers[0])
+        
+        # Social links
+        links = soup.find_all("a", href=_RE_SOCIAL, limit=8)
+        for link in links:
+            href = link.get("href", "")
+            if "github" in href.lower():
+                tpl["socialLinks"]["github"] = href
+            elif "linkedin" in href.lower():
+                tpl["socialLinks"]["linkedin"] = href
+            elif "twitter" in href.lower():
+                tpl["socialLinks"]["twitter"] = href
+            elif "website" in href.lower() or "http" in href.lower():
+                tpl["socialLinks"]["website"] = href
+        
+        # Skills
+        skills_elem = labels.get("skills")
+        if skills_elem:
+            parent = skills_elem.parent
+            if parent:
+                skills_container = parent.find_next("div") or parent.find_next("ul")
+                if skills_container:
+                    skill_tags = skills_container.find_all("span", limit=50) or skills_container.find_all("li", limit=50)
+                    skills = []
+                    for tag in skill_tags:
+                        skill_text = tag.get_text().strip()
+                        if skill_text:
+                            skills.append(skill_text)
+                    if skills:
+                        tpl["skills"] = skills
+        
+        # Badges (at most 10)
+        badge_tags = soup.find_all("div", {"class": _RE_BADGE}, limit=10) or soup.find_all("span", {"class": _RE_BADGE}, limit=10)
+        badges = []
+        for badge in badge_tags:
+            badge_text = badge.get_text().strip()
+            if badge_text:
+                badges.append(badge_text)
+        if badges:
+            tpl["badges"] = badges
     except:
         pass
     return tpl
@@ -1381,65 +1880,272 @@ def fetch_hackerrank_live(username: str) -> Dict:
 # FASTAPI APP
 # ---------------------------------------------------
 
-app = FastAPI(title="Platform Reports API", version="3.0")
+DefaultResponse = ORJSONResponse if ORJSON_AVAILABLE else JSONResponse
+
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    to_thread.current_default_thread_limiter().total_tokens = API_THREADS
+    yield
+    # Release pooled connections and worker threads on shutdown
+    SESSION.close()
+    if _redis is not None:
+        _redis.close()
+    _LC_POOL.shutdown(wait=False, cancel_futures=True)
+    _CF_POOL.shutdown(wait=False, cancel_futures=True)
+    _PW_POOL.shutdown(wait=False, cancel_futures=True)
+    _ALL_POOL.shutdown(wait=False, cancel_futures=True)
+    _REFRESH_POOL.shutdown(wait=False, cancel_futures=True)
+
+app = FastAPI(
+    title="Platform Reports API",
+    version="3.0",
+    lifespan=lifespan,
+    default_response_class=DefaultResponse,
+)
 app.add_middleware(
     CORSMiddleware,
     allow_origins=["*"],
     allow_methods=["*"],
     allow_headers=["*"],
 )
+app.add_middleware(GZipMiddleware, minimum_size=500)
+
+def _make_entry(payload, body: bytes, ttl: int):
+    """Cache entry: (payload, weak ETag over body, fresh-until, body). The
+    serialized body is kept so hits are written out without re-encoding."""
+    etag = 'W/"' + hashlib.blake2b(body, digest_size=8).hexdigest() + '"'
+    return payload, etag, time.monotonic() + ttl, body
+
+def _store_shared_hit(key: str, hit):
+    """Cache a (body, seconds left) Redis hit locally. It is fresh only for
+    the time it had left there, not a full TTL."""
+    body, left = hit
+    entry = _make_entry(_loads(body), body, left)
+    cache.set(key, entry, left + CACHE_STALE_TTL)
+    return entry
+
+# Profile host behind each single-host platform. LeetCode is left out: it
+# falls back across mirrors, each guarded by its own breaker in the adapter.
+_PLATFORM_HOSTS = {
+    "cc": "www.codechef.com",
+    "duo": "www.duolingo.com",
+    "cf": "codeforces.com",
+    "hr": "www.hackerrank.com",
+}
 
-def get_cached_or_fetch(key, fn, arg):
-    val = cache.get(key)
-    if val is not None:
-        return val
+class UpstreamUnavailable(Exception):
+    def __init__(self, host: str, retry_after: float):
+        super().__init__(f"{host} is unavailable")
+        self.host = host
+        self.retry_after = retry_after
+
+def _fetch_and_store(key, fn, arg):
+    # a flight for this key may have finished between our miss and taking ownership
+    entry = cache.get(key)
+    if entry is not None and time.monotonic() < entry[2]:
+        return entry
+    # another worker may already have fetched it
+    hit = _shared_get(key)
+    if hit is not None:
+        return _store_shared_hit(key, hit)
+    ttl = _ttl_for(key)
+    host = _PLATFORM_HOSTS.get(key.split(":", 1)[0])
+    breaker = _breaker_for(host) if host else None
+    if breaker is not None and not breaker.ready():
+        # don't cache a blank template while the upstream is known to be down
+        raise UpstreamUnavailable(host, max(breaker.remaining(), 1.0))
+    rejected = breaker.rejected if breaker is not None else 0
     data = fn(arg)
-    cache.set(key, data)
-    return data
-
-# Individual endpoints
-@app.get("/v1/leetcode/{username}")
-def api_leetcode(username: str, _rl=Depends(check_rate_limit)):
-    return get_cached_or_fetch(f"lc:{username}", fetch_leetcode_live, username)
-
-@app.get("/v1/codechef/{username}")
-def api_codechef(username: str, _rl=Depends(check_rate_limit)):
-    return get_cached_or_fetch(f"cc:{username}", fetch_codechef_live, username)
-
-@app.get("/v1/duolingo/{username}")
-def api_duolingo(username: str, _rl=Depends(check_rate_limit)):
-    return get_cached_or_fetch(f"duo:{username}", fetch_duolingo_live, username)
+    if breaker is not None and (not breaker.closed() or breaker.rejected != rejected):
+        # the fetchers turn refused calls into blank fields; a result built
+        # while the circuit opened or half-open calls were turned away is
+        # not worth keeping
+        raise UpstreamUnavailable(host, max(breaker.remaining(), 1.0))
+    body = _dumps(data)
+    entry = _make_entry(data, body, ttl)
+    _shared_set(key, body, ttl)
+    # kept past its TTL so it can be served stale while refreshing
+    cache.set(key, entry, ttl + CACHE_STALE_TTL)
+    return entry
+
+# Background refreshes of stale entries
+_REFRESH_POOL = ThreadPoolExecutor(max_workers=8, thread_name_prefix="refresh")
+
+_cache_stats = {"hits": 0, "stale_hits": 0, "misses": 0}
+_cache_stats_lock = threading.Lock()
+
+def _count(stat: str):
+    with _cache_stats_lock:
+        _cache_stats[stat] += 1
 
-@app.get("/v1/codeforces/{username}")
-def api_cf(username: str, _rl=Depends(check_rate_limit)):
-    return get_cached_or_fetch(f"cf:{username}", fetch_codeforces_live, username)
+def get_cached_or_fetch(key, fn, arg):
+    """(payload, etag, fresh_until, body) for key. Stale entries are served as-is
+    while one background refresh runs; misses fetch through the single-flight."""
+    entry = cache.get(key)
+    if entry is not None:
+        if time.monotonic() >= entry[2]:
+            _count("stale_hits")
+            flights.start(_REFRESH_POOL, key, _fetch_and_store, key, fn, arg)
+        else:
+            _count("hits")
+        return entry
+    _count("misses")
+    # only one upstream fetch per key, concurrent misses wait for it
+    try:
+        return flights.do(key, _fetch_and_store, key, fn, arg, wait=FLIGHT_WAIT)
+    except UpstreamUnavailable as e:
+        raise HTTPException(
+            status_code=503,
+            detail=f"{e.host} is unavailable, retry later",
+            headers={"Retry-After": str(math.ceil(e.retry_after))},
+        )
+    except FutureTimeoutError:
+        raise HTTPException(
+            status_code=504,
+            detail="Upstream fetch still in progress, retry shortly",
+            headers={"Retry-After": "5"},
+        )
 
-@app.get("/v1/hackerrank/{username}")
-def api_hr(username: str, _rl=Depends(check_rate_limit)):
-    return get_cached_or_fetch(f"hr:{username}", fetch_hackerrank_live, username)
+async def invalidate(pattern: str = "*") -> int:
+    """Mark entries whose key matches the glob pattern (e.g. "cf:*") stale:
+    the next hit still gets the old payload and triggers a background
+    refresh, so a purge doesn't turn into a refetch storm. Matching keys are
+    dropped from the shared tier so the refresh really goes upstream. Only
+    the Redis round trips leave the event loop."""
+    count = 0
+    for key in cache.keys():
+        if not fnmatchcase(key, pattern):
+            continue
+        entry = cache.get(key)
+        if entry is not None:
+            cache.set(key, (entry[0], entry[1], 0.0, entry[3]), CACHE_STALE_TTL)
+            count += 1
+    if _redis is not None:
+        await to_thread.run_sync(_shared_clear, pattern)
+    return count
+
+CACHE_CONTROL = f"public, max-age={CACHE_TTL}, stale-while-revalidate=300"
+
+def _etag_matches(if_none_match: Optional[str], etag: str) -> bool:
+    """Weak comparison against an If-None-Match list (or *)."""
+    if not if_none_match:
+        return False
+    if if_none_match.strip() == "*":
+        return True
+    opaque = etag[2:] if etag.startswith("W/") else etag
+    for tag in if_none_match.split(","):
+        tag = tag.strip()
+        if (tag[2:] if tag.startswith("W/") else tag) == opaque:
+            return True
+    return False
+
+def cached_response(request: Request, entry):
+    """Serve a cache entry with ETag/Cache-Control; 304 when the client's copy matches."""
+    payload, etag, _, body = entry
+    # GZipMiddleware adds Vary: Accept-Encoding to whatever it compresses
+    headers = {"ETag": etag, "Cache-Control": CACHE_CONTROL}
+    if _etag_matches(request.headers.get("if-none-match"), etag):
+        return Response(status_code=304, headers=headers)
+    if body is not None:
+        return Response(body, media_type="application/json", headers=headers)
+    return DefaultResponse(payload, headers=headers)
+
+def _platform_endpoint(prefix: str, fetcher, handler_name: str):
+    def endpoint(username: str, request: Request, _rl=Depends(check_rate_limit)):
+        return cached_response(request, get_cached_or_fetch(f"{prefix}:{username}", fetcher, username))
+    # the function name is part of the OpenAPI operation id
+    endpoint.__name__ = endpoint.__qualname__ = handler_name
+    return endpoint
+
+api_leetcode = _platform_endpoint("lc", fetch_leetcode_live, "api_leetcode")
+api_codechef = _platform_endpoint("cc", fetch_codechef_live, "api_codechef")
+api_duolingo = _platform_endpoint("duo", fetch_duolingo_live, "api_duolingo")
+api_cf = _platform_endpoint("cf", fetch_codeforces_live, "api_cf")
+api_hr = _platform_endpoint("hr", fetch_hackerrank_live, "api_hr")
+
+# (URL name, cache-key prefix / short alias, fetcher, handler) per platform
+PLATFORMS = (
+    ("leetcode", "lc", fetch_leetcode_live, api_leetcode),
+    ("codechef", "cc", fetch_codechef_live, api_codechef),
+    ("duolingo", "duo", fetch_duolingo_live, api_duolingo),
+    ("codeforces", "cf", fetch_codeforces_live, api_cf),
+    ("hackerrank", "hr", fetch_hackerrank_live, api_hr),
+)
 
-# Unified endpoint
+def _register_platform_routes() -> Dict[str, Any]:
+    """GET /v1/<name>/{username} per platform; returns name/alias -> handler
+    for the unified endpoint."""
+    routes = {}
+    for name, prefix, _, handler in PLATFORMS:
+        app.get(f"/v1/{name}/{{username}}")(handler)
+        routes[name] = routes[prefix] = handler
+    return routes
+
+_ROUTES = _register_platform_routes()
+
+# All platforms at once: fetched concurrently, so latency is the slowest one
+_ALL_POOL = ThreadPoolExecutor(max_workers=20, thread_name_prefix="report-all")
+
+# Registered before the unified route so "all" isn't taken as a platform
+@app.get("/v1/report/all/{username}")
+def api_all(username: str, request: Request, _rl=Depends(check_rate_limit)):
+    keys = [f"{prefix}:{username}" for _, prefix, _, _ in PLATFORMS]
+    # seed local misses from the shared tier in one round trip
+    missing = [key for key in keys if cache.get(key) is None]
+    for key, hit in zip(missing, _shared_get_many(missing)):
+        if hit is not None:
+            _store_shared_hit(key, hit)
+    futures = [
+        (name, _ALL_POOL.submit(get_cached_or_fetch, key, fn, username))
+        for (name, _, fn, _), key in zip(PLATFORMS, keys)
+    ]
+    payload, tags, parts, failed = {}, [], [], False
+    for name, fut in futures:
+        try:
+            entry = fut.result()
+            payload[name] = entry[0]
+            tags.append(entry[1])
+            parts.append(b'"%s":%s' % (name.encode(), entry[3]))
+        except Exception as e:
+            payload[name] = {"message": f"{name} report failed", "error": str(e)}
+            failed = True
+    if failed:
+        return DefaultResponse(payload)
+    etag = 'W/"' + hashlib.blake2b("|".join(tags).encode(), digest_size=8).hexdigest() + '"'
+    # splice the cached per-platform bodies instead of re-encoding the payload
+    return cached_response(request, (payload, etag, None, b"{" + b",".join(parts) + b"}"))
+
+# Unified endpoint: platform name or short alias
 @app.get("/v1/report/{platform}/{username}")
-def api_unified(platform: str, username: str, _rl=Depends(check_rate_limit)):
-    p = platform.lower()
-    if p in ("leetcode", "lc"):
-        return api_leetcode(username)
-    if p in ("codechef", "cc"):
-        return api_codechef(username)
-    if p in ("duolingo", "duo"):
-        return api_duolingo(username)
-    if p in ("codeforces", "cf"):
-        return api_cf(username)
-    if p in ("hackerrank", "hr"):
-        return api_hr(username)
-    raise HTTPException(404, "Unknown platform.")
+def api_unified(platform: str, username: str, request: Request, _rl=Depends(check_rate_limit)):
+    # exact hit for the usual lowercase name; casefold only for mixed case
+    handler = _ROUTES.get(platform) or _ROUTES.get(platform.casefold())
+    if handler is None:
+        raise HTTPException(404, "Unknown platform.")
+    return handler(username, request)
 
 # Health + cache admin
 @app.get("/health")
-def health():
+async def health():
     return {"status": "ok"}
 
+@app.get("/admin/cache_stats")
+async def _cache_stats_view():
+    with _cache_stats_lock:
+        stats = dict(_cache_stats)
+    lookups = sum(stats.values())
+    return {
+        "size": len(cache),
+        "maxsize": cache.maxsize,
+        **stats,
+        "hitRate": round((stats["hits"] + stats["stale_hits"]) / lookups, 4) if lookups else 0.0,
+    }
+
+@app.post("/admin/invalidate")
+async def _invalidate(pattern: str = "*"):
+    return {"pattern": pattern, "invalidated": await invalidate(pattern)}
+
 @app.post("/admin/clear_cache")
-def _clear():
-    cache.clear()
-    return {"cache": "cleared"}
+async def _clear():
+    # stale rather than deleted: entries keep being served while they refresh
+    return {"cache": "cleared", "invalidated": await invalidate("*")}
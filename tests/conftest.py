@@ -0,0 +1,21 @@
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+import api_fetchers  # noqa: E402
+
+
+@pytest.fixture(autouse=True)
+def _clean_state():
+    """Module-level cache, in-flight fetches and rate-limit buckets are
+    shared by every test; drop whatever a test left behind."""
+    yield
+    api_fetchers.cache.clear()
+    with api_fetchers.flights._lock:
+        api_fetchers.flights._inflight.clear()
+    for shard, lock in zip(api_fetchers._rate_buckets, api_fetchers._rate_locks):
+        with lock:
+            shard.clear()
@@ -0,0 +1,159 @@
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import pytest
+from fastapi import HTTPException
+
+import api_fetchers
+from api_fetchers import SingleFlight, TTLCache
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(api_fetchers.time, "monotonic", lambda: now[0])
+    return now
+
+
+class _Inline:
+    """Executor that runs submitted work straight away."""
+
+    def submit(self, fn, *args):
+        fn(*args)
+
+
+def _same_shard(cache, n):
+    keys, shard = [], None
+    i = 0
+    while len(keys) < n:
+        key = f"k{i}"
+        i += 1
+        if shard is None:
+            shard = cache._shard(key)
+        if cache._shard(key) == shard:
+            keys.append(key)
+    return keys
+
+
+def test_ttl_cache_expires(clock):
+    cache = TTLCache()
+    cache.set("a", 1, ttl=10)
+    assert cache.get("a") == 1
+    clock[0] += 11
+    assert cache.get("a") is None
+    assert len(cache) == 0
+
+
+def test_ttl_cache_is_bounded_per_shard():
+    cache = TTLCache(maxsize=TTLCache.SHARDS * 2)
+    a, b, c = _same_shard(cache, 3)
+    cache.set(a, 1)
+    cache.set(b, 2)
+    cache.set(c, 3)
+    assert cache.get(a) is None
+    assert cache.get(b) == 2
+    assert cache.get(c) == 3
+
+
+def test_ttl_cache_hit_bumps_lru():
+    cache = TTLCache(maxsize=TTLCache.SHARDS * 2)
+    a, b, c = _same_shard(cache, 3)
+    cache.set(a, 1)
+    cache.set(b, 2)
+    assert cache.get(a) == 1
+    cache.set(c, 3)
+    assert cache.get(a) == 1
+    assert cache.get(b) is None
+
+
+def test_ttl_cache_keys_spread_over_shards():
+    cache = TTLCache()
+    for i in range(256):
+        cache.set(f"user{i}", i)
+    assert len(cache) == 256
+    assert sum(1 for shard in cache._shards if shard) > 1
+    assert sorted(cache.keys()) == sorted(f"user{i}" for i in range(256))
+
+
+def test_single_flight_coalesces_concurrent_calls():
+    flights = SingleFlight()
+    release = threading.Event()
+    calls = []
+
+    def fetch(arg):
+        calls.append(arg)
+        release.wait(5)
+        return arg.upper()
+
+    with ThreadPoolExecutor(max_workers=2) as executor:
+        owner = flights.start(executor, "k", fetch, "x")
+        joined = flights.start(executor, "k", fetch, "y")
+        assert joined is owner
+        waiter = executor.submit(flights.do, "k", fetch, "z")
+        release.set()
+        assert owner.result(5) == "X"
+        assert waiter.result(5) == "X"
+    assert calls == ["x"]
+    assert flights._inflight == {}
+
+
+def test_single_flight_shares_exceptions_and_forgets_the_key():
+    flights = SingleFlight()
+
+    def fail(arg):
+        raise ValueError(arg)
+
+    with pytest.raises(ValueError):
+        flights.do("k", fail, "boom")
+    assert flights.do("k", str.upper, "ok") == "OK"
+
+
+def test_waiter_gives_up_with_504(monkeypatch):
+    monkeypatch.setattr(api_fetchers, "FLIGHT_WAIT", 0.05)
+    started, release = threading.Event(), threading.Event()
+
+    def slow(username):
+        started.set()
+        release.wait(5)
+        return {"username": username}
+
+    with ThreadPoolExecutor(max_workers=1) as executor:
+        owner = executor.submit(api_fetchers.get_cached_or_fetch, "test:slow", slow, "slow")
+        assert started.wait(5)
+        with pytest.raises(HTTPException) as exc:
+            api_fetchers.get_cached_or_fetch("test:slow", slow, "slow")
+        assert exc.value.status_code == 504
+        assert exc.value.headers["Retry-After"] == "5"
+        release.set()
+        assert owner.result(5)[0] == {"username": "slow"}
+
+
+def test_miss_fetches_and_caches():
+    calls = []
+
+    def fetch(username):
+        calls.append(username)
+        return {"username": username}
+
+    first = api_fetchers.get_cached_or_fetch("test:miss", fetch, "miss")
+    second = api_fetchers.get_cached_or_fetch("test:miss", fetch, "miss")
+    assert first[0] == {"username": "miss"}
+    assert first[3] == api_fetchers._dumps({"username": "miss"})
+    assert second is first
+    assert calls == ["miss"]
+
+
+def test_stale_entry_is_served_while_refreshing(monkeypatch, clock):
+    monkeypatch.setattr(api_fetchers, "_REFRESH_POOL", _Inline())
+    api_fetchers.get_cached_or_fetch("test:swr", lambda username: {"v": 1}, "swr")
+    clock[0] += api_fetchers.CACHE_TTL + 1
+
+    served = api_fetchers.get_cached_or_fetch("test:swr", lambda username: {"v": 2}, "swr")
+    assert served[0] == {"v": 1}
+    assert api_fetchers.cache.get("test:swr")[0] == {"v": 2}
+
+
+def test_entry_is_dropped_after_the_stale_window(clock):
+    api_fetchers.get_cached_or_fetch("test:old", lambda username: {"v": 1}, "old")
+    clock[0] += api_fetchers.CACHE_TTL + api_fetchers.CACHE_STALE_TTL + 1
+    assert api_fetchers.cache.get("test:old") is None
@@ -0,0 +1,183 @@
+import threading
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+import api_fetchers
+from api_fetchers import CircuitBreaker, CircuitOpenError, HostBusyError, UpstreamUnavailable
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(api_fetchers.time, "monotonic", lambda: now[0])
+    return now
+
+
+@pytest.fixture
+def breakers(monkeypatch):
+    monkeypatch.setattr(api_fetchers, "_breakers", {})
+    return api_fetchers._breakers
+
+
+def _open(breaker):
+    for _ in range(breaker.fail_max):
+        breaker.failure()
+
+
+def test_opens_after_fail_max(clock):
+    breaker = CircuitBreaker(fail_max=3, reset_timeout=30)
+    breaker.failure()
+    breaker.failure()
+    assert breaker.closed()
+    assert breaker.allow() == CircuitBreaker.CLOSED
+    breaker.failure()
+    assert not breaker.closed()
+    assert breaker.allow() is None
+    assert breaker.remaining() == 30
+
+
+def test_success_resets_failure_count(clock):
+    breaker = CircuitBreaker(fail_max=2, reset_timeout=30)
+    breaker.failure()
+    breaker.success()
+    breaker.failure()
+    assert breaker.closed()
+
+
+def test_open_circuit_fails_fast_and_counts_rejections(clock):
+    breaker = CircuitBreaker(fail_max=1, reset_timeout=30)
+    _open(breaker)
+    clock[0] += 10
+    assert breaker.allow() is None
+    assert breaker.allow() is None
+    assert breaker.rejected == 2
+    assert breaker.remaining() == 20
+    assert not breaker.ready()
+
+
+def test_half_open_grants_a_single_trial(clock):
+    breaker = CircuitBreaker(fail_max=1, reset_timeout=30)
+    _open(breaker)
+    clock[0] += 30
+    assert breaker.ready()
+    assert breaker.allow() == CircuitBreaker.TRIAL
+    assert not breaker.ready()
+    assert breaker.allow() is None
+    assert breaker.rejected == 1
+
+
+def test_trial_success_closes(clock):
+    breaker = CircuitBreaker(fail_max=1, reset_timeout=30)
+    _open(breaker)
+    clock[0] += 30
+    breaker.allow()
+    breaker.success()
+    assert breaker.closed()
+    assert breaker.allow() == CircuitBreaker.CLOSED
+
+
+def test_trial_failure_reopens(clock):
+    breaker = CircuitBreaker(fail_max=5, reset_timeout=30)
+    _open(breaker)
+    clock[0] += 30
+    breaker.allow()
+    breaker.failure()
+    assert not breaker.closed()
+    assert breaker.remaining() == 30
+    assert breaker.allow() is None
+
+
+def test_cancel_trial_frees_it_for_the_next_request(clock):
+    breaker = CircuitBreaker(fail_max=1, reset_timeout=30)
+    _open(breaker)
+    clock[0] += 30
+    assert breaker.allow() == CircuitBreaker.TRIAL
+    breaker.cancel_trial()
+    assert not breaker.closed()
+    assert breaker.allow() == CircuitBreaker.TRIAL
+
+
+def _half_open(breakers, clock, host):
+    breaker = breakers[host] = CircuitBreaker(fail_max=1, reset_timeout=30)
+    _open(breaker)
+    clock[0] += 30
+    return breaker
+
+
+def test_adapter_busy_host_does_not_wedge_the_trial(monkeypatch, breakers, clock):
+    breaker = _half_open(breakers, clock, "busy.example")
+    slots = threading.BoundedSemaphore(1)
+    slots.acquire()
+    monkeypatch.setattr(api_fetchers, "_slots_for", lambda host: slots)
+    monkeypatch.setattr(api_fetchers, "HOST_WAIT", 0)
+    request = requests.Request("GET", "https://busy.example/").prepare()
+    with pytest.raises(HostBusyError):
+        api_fetchers._UpstreamAdapter().send(request)
+    assert breaker.allow() == CircuitBreaker.TRIAL
+
+
+def test_adapter_unexpected_error_does_not_wedge_the_trial(monkeypatch, breakers, clock):
+    breaker = _half_open(breakers, clock, "bad.example")
+
+    def boom(self, request, **kwargs):
+        raise requests.exceptions.InvalidHeader("bad header")
+
+    monkeypatch.setattr(HTTPAdapter, "send", boom)
+    request = requests.Request("GET", "https://bad.example/").prepare()
+    with pytest.raises(requests.exceptions.InvalidHeader):
+        api_fetchers._UpstreamAdapter().send(request)
+    assert breaker.allow() == CircuitBreaker.TRIAL
+
+
+def test_adapter_rejects_while_open(breakers, clock):
+    breakers["down.example"] = breaker = CircuitBreaker(fail_max=1, reset_timeout=30)
+    _open(breaker)
+    request = requests.Request("GET", "https://down.example/").prepare()
+    with pytest.raises(CircuitOpenError):
+        api_fetchers._UpstreamAdapter().send(request)
+
+
+def test_fetch_skipped_while_trial_in_flight(breakers, clock):
+    breaker = _half_open(breakers, clock, api_fetchers._PLATFORM_HOSTS["cf"])
+    breaker.allow()
+    calls = []
+    with pytest.raises(UpstreamUnavailable):
+        api_fetchers._fetch_and_store("cf:trial-in-flight", calls.append, "x")
+    assert calls == []
+    assert api_fetchers.cache.get("cf:trial-in-flight") is None
+
+
+def test_half_open_result_with_rejected_calls_is_not_cached(breakers, clock):
+    breaker = _half_open(breakers, clock, api_fetchers._PLATFORM_HOSTS["cf"])
+
+    def fetch(username):
+        # the trial call succeeds, a sibling call is turned away
+        assert breaker.allow() == CircuitBreaker.TRIAL
+        assert breaker.allow() is None
+        breaker.success()
+        return {"username": username, "rating": "N/A"}
+
+    with pytest.raises(UpstreamUnavailable):
+        api_fetchers._fetch_and_store("cf:half-open", fetch, "half-open")
+    assert api_fetchers.cache.get("cf:half-open") is None
+    assert breaker.closed()
+
+
+def test_result_is_not_cached_when_circuit_opens_mid_fetch(breakers, clock):
+    breaker = breakers[api_fetchers._PLATFORM_HOSTS["cf"]] = CircuitBreaker(fail_max=1, reset_timeout=30)
+
+    def fetch(username):
+        breaker.failure()
+        return {"username": username}
+
+    with pytest.raises(UpstreamUnavailable):
+        api_fetchers._fetch_and_store("cf:opened", fetch, "opened")
+    assert api_fetchers.cache.get("cf:opened") is None
+
+
+def test_closed_circuit_caches(breakers, clock):
+    entry = api_fetchers._fetch_and_store("cf:healthy", lambda username: {"username": username}, "healthy")
+    assert entry[0] == {"username": "healthy"}
+    assert api_fetchers.cache.get("cf:healthy") is not None
@@ -0,0 +1,72 @@
+from types import SimpleNamespace
+
+import pytest
+from fastapi import HTTPException
+
+import api_fetchers
+
+
+@pytest.fixture
+def clock(monkeypatch):
+    now = [1000.0]
+    monkeypatch.setattr(api_fetchers.time, "monotonic", lambda: now[0])
+    return now
+
+
+def _request(ip):
+    return SimpleNamespace(client=SimpleNamespace(host=ip))
+
+
+def _same_shard_ips(n):
+    ips, shard = [], None
+    i = 0
+    while len(ips) < n:
+        ip = f"10.0.{i // 256}.{i % 256}"
+        i += 1
+        if shard is None:
+            shard = hash(ip) & (api_fetchers._RATE_SHARDS - 1)
+        if hash(ip) & (api_fetchers._RATE_SHARDS - 1) == shard:
+            ips.append(ip)
+    return ips, api_fetchers._rate_buckets[shard]
+
+
+def test_token_bucket_refills_over_time():
+    bucket = api_fetchers.TokenBucket(0.0)
+    for _ in range(api_fetchers.RATE_LIMIT):
+        assert bucket.try_consume(0.0) == 0
+    wait = bucket.try_consume(0.0)
+    assert wait == pytest.approx(1 / api_fetchers._RATE_REFILL)
+    assert bucket.try_consume(wait) == 0
+
+
+def test_limit_raises_429_with_headers(clock):
+    request = _request("10.9.9.9")
+    for _ in range(api_fetchers.RATE_LIMIT):
+        api_fetchers.check_rate_limit(request)
+    with pytest.raises(HTTPException) as exc:
+        api_fetchers.check_rate_limit(request)
+    assert exc.value.status_code == 429
+    assert exc.value.detail["code"] == "rate_limited"
+    assert exc.value.headers["X-RateLimit-Remaining"] == "0"
+    assert int(exc.value.headers["Retry-After"]) >= 1
+
+
+def test_least_recently_used_bucket_is_evicted(monkeypatch, clock):
+    monkeypatch.setattr(api_fetchers, "_RATE_MAX_KEYS", 2)
+    (a, b, c), buckets = _same_shard_ips(3)
+    api_fetchers.check_rate_limit(_request(a))
+    api_fetchers.check_rate_limit(_request(b))
+    api_fetchers.check_rate_limit(_request(a))
+    api_fetchers.check_rate_limit(_request(c))
+    assert list(buckets) == [a, c]
+
+
+def test_idle_buckets_are_swept(clock):
+    (a, b, c), buckets = _same_shard_ips(3)
+    api_fetchers.check_rate_limit(_request(a))
+    api_fetchers.check_rate_limit(_request(b))
+    clock[0] += api_fetchers._RATE_IDLE / 2
+    api_fetchers.check_rate_limit(_request(b))
+    clock[0] += api_fetchers._RATE_IDLE / 2 + 1
+    api_fetchers.check_rate_limit(_request(c))
+    assert list(buckets) == [b, c]
@@ -0,0 +1,97 @@
+import pytest
+from fastapi.testclient import TestClient
+
+import api_fetchers
+
+
+@pytest.fixture
+def client():
+    return TestClient(api_fetchers.app)
+
+
+def _cache(key, payload):
+    body = api_fetchers._dumps(payload)
+    api_fetchers.cache.set(key, api_fetchers._make_entry(payload, body, 60), 60)
+
+
+@pytest.mark.parametrize("header, matches", [
+    (None, False),
+    ("", False),
+    ("*", True),
+    ('W/"abc"', True),
+    ('"abc"', True),
+    ('"xyz", W/"abc"', True),
+    ('"xyz"', False),
+])
+def test_etag_matching_is_weak(header, matches):
+    assert api_fetchers._etag_matches(header, 'W/"abc"') is matches
+
+
+def test_platform_endpoint_serves_cached_body_and_304(client):
+    _cache("cf:tourist", {"username": "tourist", "rating": 3800})
+    r = client.get("/v1/codeforces/tourist")
+    assert r.status_code == 200
+    assert r.json() == {"username": "tourist", "rating": 3800}
+    assert r.headers["cache-control"] == api_fetchers.CACHE_CONTROL
+    etag = r.headers["etag"]
+    assert etag.startswith('W/"')
+
+    r = client.get("/v1/codeforces/tourist", headers={"If-None-Match": etag})
+    assert r.status_code == 304
+    assert r.content == b""
+    assert r.headers["etag"] == etag
+
+
+def test_unified_endpoint_accepts_name_or_alias(client):
+    _cache("cf:tourist", {"username": "tourist"})
+    assert client.get("/v1/report/cf/tourist").json() == {"username": "tourist"}
+    assert client.get("/v1/report/Codeforces/tourist").json() == {"username": "tourist"}
+
+
+def _cache_all(username):
+    payloads = {}
+    for name, prefix, _, _ in api_fetchers.PLATFORMS:
+        payloads[name] = {"username": username, "platform": name}
+        _cache(f"{prefix}:{username}", payloads[name])
+    return payloads
+
+
+def test_report_all_splices_cached_bodies(client):
+    payloads = _cache_all("alice")
+    r = client.get("/v1/report/all/alice")
+    assert r.status_code == 200
+    assert r.json() == payloads
+    assert list(r.json()) == [name for name, _, _, _ in api_fetchers.PLATFORMS]
+
+    r = client.get("/v1/report/all/alice", headers={"If-None-Match": r.headers["etag"]})
+    assert r.status_code == 304
+
+
+def test_report_all_etag_follows_the_parts(client):
+    _cache_all("bob")
+    etag = client.get("/v1/report/all/bob").headers["etag"]
+    _cache("cf:bob", {"username": "bob", "rating": 1})
+    assert client.get("/v1/report/all/bob").headers["etag"] != etag
+
+
+def test_report_all_reports_failed_platforms(monkeypatch, client):
+    payloads = _cache_all("carol")
+    api_fetchers.cache.clear()
+    for name, prefix, _, _ in api_fetchers.PLATFORMS:
+        if prefix != "hr":
+            _cache(f"{prefix}:carol", payloads[name])
+
+    def fail(username):
+        raise RuntimeError("upstream exploded")
+
+    monkeypatch.setattr(api_fetchers, "PLATFORMS", tuple(
+        (name, prefix, fail if prefix == "hr" else fn, handler)
+        for name, prefix, fn, handler in api_fetchers.PLATFORMS
+    ))
+    r = client.get("/v1/report/all/carol")
+    assert r.status_code == 200
+    assert "etag" not in r.headers
+    body = r.json()
+    assert body["codeforces"] == payloads["codeforces"]
+    assert body["hackerrank"]["message"] == "hackerrank report failed"
+    assert "upstream exploded" in body["hackerrank"]["error"]
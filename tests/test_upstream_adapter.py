@@ -0,0 +1,102 @@
+import io
+import threading
+
+import pytest
+import requests
+from requests.adapters import HTTPAdapter
+
+import api_fetchers
+from api_fetchers import CircuitBreaker
+
+
+class _Answers:
+    """Stand-in for HTTPAdapter.send: answers with the given statuses in turn
+    and records how many host slots were free at each call."""
+
+    def __init__(self, slots, *statuses):
+        self.slots = slots
+        self.statuses = list(statuses)
+        self.calls = []
+
+    def send(self, adapter, request, **kwargs):
+        self.calls.append(self.slots._value)
+        response = requests.Response()
+        response.status_code = self.statuses.pop(0)
+        response.raw = io.BytesIO(b"")
+        response.request = request
+        return response
+
+
+@pytest.fixture
+def host(monkeypatch):
+    monkeypatch.setattr(api_fetchers, "_breakers", {})
+    slots = threading.BoundedSemaphore(1)
+    monkeypatch.setattr(api_fetchers, "_slots_for", lambda host: slots)
+    sleeps = []
+
+    def sleep(seconds):
+        # backoff happens with the host's slot handed back
+        assert slots._value == 1
+        sleeps.append(seconds)
+
+    monkeypatch.setattr(api_fetchers.time, "sleep", sleep)
+    return slots, sleeps
+
+
+def _send(method="GET"):
+    request = requests.Request(method, "https://upstream.example/").prepare()
+    return api_fetchers._UpstreamAdapter().send(request)
+
+
+def test_retries_5xx_outside_the_host_slot(monkeypatch, host):
+    slots, sleeps = host
+    answers = _Answers(slots, 503, 502, 200)
+    monkeypatch.setattr(HTTPAdapter, "send", lambda *args, **kwargs: answers.send(*args, **kwargs))
+    assert _send().status_code == 200
+    assert len(answers.calls) == 3
+    assert sleeps == [api_fetchers.UPSTREAM_BACKOFF, api_fetchers.UPSTREAM_BACKOFF * 2]
+    assert slots._value == 1
+    assert api_fetchers._breaker_for("upstream.example")._failures == 0
+
+
+def test_gives_up_with_the_last_5xx(monkeypatch, host):
+    slots, sleeps = host
+    answers = _Answers(slots, 503, 503, 503)
+    monkeypatch.setattr(HTTPAdapter, "send", lambda *args, **kwargs: answers.send(*args, **kwargs))
+    assert _send().status_code == 503
+    assert len(answers.calls) == 1 + api_fetchers.UPSTREAM_RETRIES
+    assert api_fetchers._breaker_for("upstream.example")._failures == 1
+
+
+def test_post_is_not_retried(monkeypatch, host):
+    slots, sleeps = host
+    answers = _Answers(slots, 503)
+    monkeypatch.setattr(HTTPAdapter, "send", lambda *args, **kwargs: answers.send(*args, **kwargs))
+    assert _send("POST").status_code == 503
+    assert len(answers.calls) == 1
+    assert sleeps == []
+
+
+def test_transport_error_is_not_retried(monkeypatch, host):
+    calls = []
+
+    def refuse(adapter, request, **kwargs):
+        calls.append(request)
+        raise requests.ConnectionError("refused")
+
+    monkeypatch.setattr(HTTPAdapter, "send", refuse)
+    with pytest.raises(requests.ConnectionError):
+        _send()
+    assert len(calls) == 1
+    assert api_fetchers._breaker_for("upstream.example")._failures == 1
+
+
+def test_busy_host_is_not_a_breaker_failure(monkeypatch, host):
+    slots, _ = host
+    slots.acquire()
+    monkeypatch.setattr(api_fetchers, "HOST_WAIT", 0)
+    with pytest.raises(api_fetchers.HostBusyError):
+        _send()
+    breaker = api_fetchers._breaker_for("upstream.example")
+    assert breaker._failures == 0
+    assert breaker.allow() == CircuitBreaker.CLOSED